@@ -171,10 +171,12 @@ setup(
     #
     # Similar to `install_requires` above, these must be valid existing
     # projects.
-    # extras_require={  # Optional
-    #     'dev': ['check-manifest'],
-    #     'test': ['coverage'],
-    # },
+    #
+    # asyncpg backs the coroutine API of the repositories; the synchronous
+    # API runs on psycopg2 alone.
+    extras_require={  # Optional
+        'async': ['asyncpg'],
+    },
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.
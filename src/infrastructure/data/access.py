@@ -20,19 +20,46 @@
 # =========================================================================== #
 """Database context class."""
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import csv
+import functools
+import hashlib
+import io
 import logging
-from typing import Union
+from typing import TYPE_CHECKING, Union
 import uuid
+import weakref
 
-import pandas as pd
+from psycopg2 import extensions
 
 from .sequel import Sequel, AccessSequel
+from .connect import Connection
+from .database import Database
 from src.infrastructure.data.config import DBCredentials
 from ...utils.logger import exception_handler
+
+if TYPE_CHECKING:
+    import pandas as pd
 # --------------------------------------------------------------------------- #
 logger = logging.getLogger(__name__)
 
 
+# --------------------------------------------------------------------------- #
+def _pooled(method):
+    """Returns the DAO connection to the pool once the method completes.
+
+    Inside a transaction the connection is held until commit or rollback.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if not self._connection.in_transaction:
+                self._release()
+    return wrapper
+
+
 # --------------------------------------------------------------------------- #
 #                      DATABASE ACCESS OBJECT                                 #
 # --------------------------------------------------------------------------- #
@@ -42,7 +69,7 @@ class Access(ABC):
 
     def __init__(self, connection, end=0) -> None:
         self._connection = connection
-        self._command = Command()
+        self._command = Database()
 
         self._end = end
 
@@ -64,7 +91,7 @@ class Access(ABC):
              filter_key: str = None,
              filter_value: Union[str, int, float] = None,
              schema: str = 'public')\
-            -> pd.DataFrame:
+            -> "pd.DataFrame":
         pass
 
     @abstractmethod
@@ -86,6 +113,9 @@ class Access(ABC):
 class PGDao(Access):
     """Postgres data access object."""
 
+    # Names of statements prepared on each pooled session.
+    _prepared = weakref.WeakKeyDictionary()
+
     def __init__(self, connection, name=None) -> None:
         """Postgres Database Context Object (PGDao)
 
@@ -103,6 +133,48 @@ class PGDao(Access):
         self._response = None
         self._response_description = None
 
+    @classmethod
+    def from_pool(cls, credentials: DBCredentials, autocommit: bool = True,
+                  name: str = None):
+        """Creates a PGDao drawing connections from the shared pool.
+
+        A connection is borrowed for each operation, or for the length of
+        a transaction, and returned to the pool afterwards.
+
+        Arguments:
+            credentials (DBCredentials): Credentials including the database.
+            autocommit (bool): Whether statements commit on execution.
+            name (str): A name of a table to which access is required.
+
+        """
+        connection = Connection(credentials, autocommit=autocommit)
+        return cls(connection, name=name)
+
+    @contextmanager
+    def transaction(self):
+        """Runs the enclosed statements in one transaction.
+
+        The transaction borrows a connection of its own and yields a DAO
+        bound to it, so other calls on this DAO neither join nor disturb
+        it. It is committed on exit or rolled back if an exception is
+        raised, and the connection returned to the pool either way.
+        """
+        connection = Connection(self._connection.credentials,
+                                autocommit=False)
+        connection.begin_transaction()
+        try:
+            yield PGDao(connection, name=self._name)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def _release(self) -> None:
+        """Returns the connection to the pool."""
+        self._connection.close()
+
     @exception_handler()
     def __iter__(self):
         sequel = self._sequel.read(name=self._name, schema='public')
@@ -117,6 +189,7 @@ class PGDao(Access):
     @exception_handler()
     def __next__(self):
         if self._response.fetchone is not None:
+            import pandas as pd
             result = pd.DataFrame(
                 data=list(self._response.fetchone), index=list(self._columns))
             self._response = self._command.execute_next(self._response.cursor)
@@ -125,6 +198,21 @@ class PGDao(Access):
             raise StopIteration
 
     @exception_handler()
+    @_pooled
+    def execute(self, sequel: Sequel):
+        """Executes a prebuilt sequel on the DAO connection.
+
+        Arguments
+            sequel (Sequel): The command and its parameters.
+
+        Returns:
+            response (Response): The rowcount and any rows returned.
+        """
+        response = self._command.execute(sequel, self._connection)
+        return response
+
+    @exception_handler()
+    @_pooled
     def create(self, name: str, columns: list,
                values: list, schema: str = 'public') -> None:
         """Adds a row to the designated table.
@@ -141,9 +229,8 @@ class PGDao(Access):
         Returns:
             rowcount (int): The number of rows inserted.
         """
-        id = str(uuid.uuid4())
-        columns.append('id')
-        values.append(id)
+        columns = (*columns, 'id')
+        values = (*values, str(uuid.uuid4()))
 
         sequel = self._sequel.create(name=name, schema=schema,
                                      columns=columns, values=values)
@@ -151,11 +238,156 @@ class PGDao(Access):
         return response
 
     @exception_handler()
+    @_pooled
+    def create_many(self, name: str, columns: list, values: list,
+                    schema: str = 'public', page_size: int = 1000) -> None:
+        """Adds many rows to the designated table in one statement per page.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of row tuples, each ordered as columns.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            page_size (int): Number of rows sent per round-trip.
+                Optional. Default=1000
+
+        Returns:
+            rowcount (int): The number of rows inserted.
+        """
+        columns = [*columns, 'id']
+        values = [(*row, str(uuid.uuid4())) for row in values]
+
+        sequel = self._sequel.create_many(name=name, schema=schema,
+                                          columns=columns, values=values)
+        response = self._command.execute_values(
+            sequel, self._connection, page_size=page_size,
+            template=self._sequel.values_template(len(columns)))
+        return response
+
+    @exception_handler()
+    @_pooled
+    def upsert(self, name: str, columns: list, values: list,
+               conflict_key: str, schema: str = 'public') -> None:
+        """Inserts a row, or updates the row whose conflict_key matches.
+
+        The upsert is one INSERT ... ON CONFLICT statement, so concurrent
+        upserts of a new key don't race. It creates or replaces: PostgreSQL
+        checks NOT NULL before the conflict, so the columns must cover the
+        NOT NULL columns without defaults even when the row exists. Use
+        update_many_columns to change some columns of an existing row.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of values corresponding with the columns.
+            conflict_key (str): Uniquely constrained column identifying
+                the existing row.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        Returns:
+            rowcount (int): The number of rows inserted or updated.
+        """
+        columns = (*columns, 'id')
+        values = (*values, str(uuid.uuid4()))
+
+        sequel = self._sequel.upsert(name=name, schema=schema,
+                                     columns=columns, values=values,
+                                     conflict_key=conflict_key)
+        response = self._command.execute(sequel, self._connection)
+        return response
+
+    @exception_handler()
+    @_pooled
+    def upsert_many(self, name: str, columns: list, values: list,
+                    conflict_key: str, schema: str = 'public',
+                    page_size: int = 1000) -> None:
+        """Upserts many rows in one statement per page.
+
+        As with upsert, the rows must cover the NOT NULL columns.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of row tuples, each ordered as columns.
+            conflict_key (str): Uniquely constrained column identifying
+                existing rows. Must be unique within values as well.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            page_size (int): Number of rows sent per round-trip.
+                Optional. Default=1000
+
+        Returns:
+            rowcount (int): The number of rows inserted or updated.
+        """
+        columns = [*columns, 'id']
+        values = [(*row, str(uuid.uuid4())) for row in values]
+
+        sequel = self._sequel.upsert_many(name=name, schema=schema,
+                                          columns=columns, values=values,
+                                          conflict_key=conflict_key)
+        response = self._command.execute_values(
+            sequel, self._connection, page_size=page_size,
+            template=self._sequel.values_template(len(columns)))
+        return response
+
+    @exception_handler()
+    @_pooled
+    def create_copy(self, name: str, columns: list, values: list,
+                    schema: str = 'public') -> None:
+        """Bulk loads rows into the designated table via COPY FROM STDIN.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of row tuples, each ordered as columns.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        Returns:
+            rowcount (int): The number of rows inserted.
+        """
+        columns = [*columns, 'id']
+
+        # None is written as the NULL marker; csv would write it as an empty
+        # field, which COPY could not tell apart from ''.
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in values:
+            writer.writerow([self._copy_value(value) for value in row]
+                            + [str(uuid.uuid4())])
+        buffer.seek(0)
+
+        sequel = self._sequel.copy_from(name=name, schema=schema,
+                                        columns=columns)
+        response = self._command.execute_copy(sequel, self._connection,
+                                              buffer)
+        return response
+
+    def _copy_value(self, value):
+        """Formats a value for the CSV COPY format."""
+        if value is None:
+            return AccessSequel.copy_null
+        if isinstance(value, (list, tuple)):
+            return "{" + ",".join(
+                'NULL' if v is None else
+                '"{}"'.format(str(v).replace('\\', '\\\\')
+                              .replace('"', '\\"'))
+                for v in value) + "}"
+        return value
+
+    @exception_handler()
+    @_pooled
     def read(self, name: str, columns: list = None,
              filter_key: str = None,
              filter_value: Union[str, int, float] = None,
              schema: str = 'public')\
-            -> pd.DataFrame:
+            -> "pd.DataFrame":
         """Reads data from a table
 
         Arguments
@@ -175,12 +407,218 @@ class PGDao(Access):
                                    filter_value=filter_value)
         response = self._command.execute(sequel, self._connection)
 
+        import pandas as pd
         colnames = [element[0] for element in response.description]
         df = pd.DataFrame(data=response.fetchall, columns=colnames)
 
         return df
 
     @exception_handler()
+    @_pooled
+    def read_copy(self, name: str, filter_key: str = None,
+                  filter_value: Union[str, int, float] = None,
+                  schema: str = 'public') -> "pd.DataFrame":
+        """Reads a table through COPY TO STDOUT and parses it with pandas.
+
+        Rows are streamed as CSV and parsed in C by pandas rather than
+        materialized as Python tuples. The column types, read from an empty
+        query, restore what CSV loses: text is kept as text, booleans,
+        timestamps and dates are converted by column, and arrays are parsed
+        into lists. NULL is marked apart from the empty string.
+
+        Arguments
+            name (str): Table from which to read
+            filter_key (str): Column containing value for subset
+                Optional. If no value is provided, all rows
+                are returned.
+            filter_value (Union[str, int, float]) The value to match.
+                Optional. If no value is provided, all rows
+                are returned.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        """
+        import pandas as pd
+        sequel = self._sequel.copy_to(name=name, schema=schema,
+                                      filter_key=filter_key,
+                                      filter_value=filter_value)
+        description = self._command.execute(
+            self._sequel.describe(name=name, schema=schema),
+            self._connection).description
+
+        buffer = io.StringIO()
+        self._command.execute_copy(sequel, self._connection, buffer)
+        buffer.seek(0)
+
+        # Text is read as text: only the NULL marker is missing, so 'NA',
+        # '007' and '' come back as written.
+        null = self._sequel.copy_null
+        arrays = {column.name: extensions.string_types[column.type_code]
+                  for column in description
+                  if extensions.string_types.get(
+                      column.type_code, extensions.UNICODE).name
+                  .endswith('ARRAY')}
+        text = {column.name: str for column in description
+                if column.type_code in extensions.UNICODE.values}
+        df = pd.read_csv(buffer, dtype=text, keep_default_na=False,
+                         na_values=[null], converters={
+                             column: lambda value, cast=cast: cast(
+                                 None if value == null else value, None)
+                             for column, cast in arrays.items()})
+
+        for column in description:
+            if column.type_code in extensions.BOOLEAN.values:
+                df[column.name] = df[column.name].map({'t': True,
+                                                       'f': False})
+            elif column.type_code in extensions.PYDATETIMETZ.values:
+                df[column.name] = pd.to_datetime(df[column.name], utc=True)
+            elif column.type_code in (*extensions.PYDATETIME.values,
+                                      *extensions.PYDATE.values):
+                df[column.name] = pd.to_datetime(df[column.name])
+
+        return df
+
+    def iter_read(self, name: str, filter_key: str = None,
+                  filter_value: Union[str, int, float] = None,
+                  schema: str = 'public', chunksize: int = 10_000):
+        """Yields rows as dictionaries through a server side cursor.
+
+        Rows are fetched chunksize at a time, so memory is bounded by the
+        chunk rather than the table. Named cursors live inside a
+        transaction, which holds a pooled connection of its own until the
+        iterator is exhausted or closed.
+
+        Arguments
+            name (str): Table from which to read
+            filter_key (str): Column containing value for subset
+                Optional. If no value is provided, all rows
+                are returned.
+            filter_value (Union[str, int, float]) The value to match.
+                Optional. If no value is provided, all rows
+                are returned.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            chunksize (int): Rows fetched per round-trip.
+                Optional. Default=10,000
+
+        """
+        sequel = self._sequel.read(name=name, schema=schema,
+                                   filter_key=filter_key,
+                                   filter_value=filter_value)
+        with self.transaction() as dao:
+            cursor = dao._connection.connection.cursor(
+                name="iter_read_{}".format(uuid.uuid4().hex))
+            cursor.itersize = chunksize
+            try:
+                cursor.execute(sequel.cmd, sequel.params)
+                colnames = None
+                for row in cursor:
+                    if colnames is None:
+                        colnames = [element[0]
+                                    for element in cursor.description]
+                    yield dict(zip(colnames, row))
+            finally:
+                cursor.close()
+        logger.info(sequel.description)
+
+    @exception_handler()
+    @_pooled
+    def read_prepared(self, name: str, filter_key: str,
+                      filter_value: Union[str, int, float],
+                      schema: str = 'public') -> "pd.DataFrame":
+        """Reads the rows matching a key through a prepared statement.
+
+        The statement is prepared once per pooled session, so repeated
+        lookups skip server side parsing and planning.
+
+        Arguments
+            name (str): Table from which to read
+            filter_key (str): Column containing value for subset
+            filter_value (Union[str, int, float]) The value to match.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        """
+        sequel = self._read_prepared(name=name, filter_key=filter_key,
+                                     filter_value=filter_value,
+                                     schema=schema)
+        response = self._command.execute(sequel, self._connection)
+
+        import pandas as pd
+        colnames = [element[0] for element in response.description]
+        df = pd.DataFrame(data=response.fetchall, columns=colnames)
+
+        return df
+
+    @exception_handler()
+    @_pooled
+    def fetchone_dict(self, name: str, filter_key: str,
+                      filter_value: Union[str, int, float],
+                      schema: str = 'public') -> dict:
+        """Returns the first row matching a key as a dictionary.
+
+        Intended for single row lookups, where building a DataFrame would
+        cost more than the query itself.
+
+        Arguments
+            name (str): Table from which to read
+            filter_key (str): Column containing value for subset
+            filter_value (Union[str, int, float]) The value to match.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        Returns:
+            row (dict): Column names mapped to values, or None if no row
+                matches.
+        """
+        sequel = self._read_prepared(name=name, filter_key=filter_key,
+                                     filter_value=filter_value,
+                                     schema=schema)
+        response = self._command.execute_one(sequel, self._connection)
+        response.cursor.close()
+
+        if response.fetchone is None:
+            return None
+        colnames = [element[0] for element in response.description]
+        return dict(zip(colnames, response.fetchone))
+
+    def _read_prepared(self, name: str, filter_key: str,
+                       filter_value: Union[str, int, float],
+                       schema: str) -> Sequel:
+        """Prepares the keyed read if needed and returns its EXECUTE."""
+        statement = "_".join(("read", schema, name, filter_key))
+        self._prepare(statement, self._sequel.prepare_read(
+            statement=statement, name=name, schema=schema,
+            filter_key=filter_key))
+
+        return self._sequel.execute_prepared(statement=statement, name=name,
+                                             params=(filter_value,))
+
+    def _update_prepared(self, name: str, columns: list, values: list,
+                         filter_key: str,
+                         filter_value: Union[str, float, int],
+                         schema: str, now: tuple = ()) -> Sequel:
+        """Prepares the keyed update if needed and returns its EXECUTE."""
+        key = repr((schema, name, tuple(columns), filter_key,
+                    tuple(now))).encode()
+        statement = "update_{}".format(hashlib.md5(key).hexdigest())
+        self._prepare(statement, self._sequel.prepare_update(
+            statement=statement, name=name, schema=schema, columns=columns,
+            filter_key=filter_key, now=tuple(now)))
+
+        return self._sequel.execute_prepared(
+            statement=statement, name=name, params=(*values, filter_value))
+
+    def _prepare(self, statement: str, sequel: Sequel) -> None:
+        """Prepares a statement on the current session if not yet prepared."""
+        prepared = PGDao._prepared.setdefault(self._connection.connection,
+                                              set())
+        if statement not in prepared:
+            self._command.execute(sequel, self._connection)
+            prepared.add(statement)
+
+    @exception_handler()
+    @_pooled
     def update(self, name: str, column: str,
                value: Union[str, float, int], filter_key: str,
                filter_value: Union[str, float, int],
@@ -200,16 +638,86 @@ class PGDao(Access):
         Returns:
             rowcount (int): The number of rows updated.
         """
-        sequel = self._sequel.update(name=name,
-                                     schema=schema, column=column,
-                                     value=value, filter_key=filter_key,
-                                     filter_value=filter_value)
+        sequel = self._update_prepared(name=name, columns=[column],
+                                       values=[value], filter_key=filter_key,
+                                       filter_value=filter_value,
+                                       schema=schema)
 
         response = self._command.execute(sequel, self._connection)
 
         return response
 
     @exception_handler()
+    @_pooled
+    def update_many_columns(self, name: str, columns: list, values: list,
+                            filter_key: str,
+                            filter_value: Union[str, float, int],
+                            schema: str = 'public', now: list = ()) -> None:
+        """Updates several columns of a row in a single statement.
+
+        Arguments
+            name (str): Name of table
+            columns (list): The columns to update
+            values (list): The values to assign, in the order of columns.
+            filter_key (str): Column upon which the condition applies.
+            filter_value (Union[str, int, float]): Value to which
+                filter_key must match.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            now (list): Columns set to the server's now() rather than
+                to a value. Optional. Default=()
+
+        Returns:
+            rowcount (int): The number of rows updated.
+        """
+        if (len(columns) != len(values)):
+            raise ValueError(
+                "Number of columns doesn't match number of values")
+
+        sequel = self._update_prepared(name=name, columns=columns,
+                                       values=values, filter_key=filter_key,
+                                       filter_value=filter_value,
+                                       schema=schema, now=now)
+
+        response = self._command.execute(sequel, self._connection)
+
+        return response
+
+    @exception_handler()
+    @_pooled
+    def update_batch(self, name: str, columns: list, values: list,
+                     filter_key: str, schema: str = 'public',
+                     page_size: int = 500, now: list = ()) -> None:
+        """Updates many rows, sending a page of statements per round-trip.
+
+        Arguments
+            name (str): Name of table
+            columns (list): The columns to update
+            values (list): List of row tuples, each holding the values for
+                columns followed by the filter_key value of the row.
+            filter_key (str): Column upon which the condition applies.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            page_size (int): Number of statements sent per round-trip.
+                Optional. Default=500
+            now (list): Columns set to the server's now() rather than
+                to a value. Optional. Default=()
+
+        Returns:
+            rowcount (int): The number of rows submitted.
+        """
+        sequel = self._sequel.update_batch(name=name, schema=schema,
+                                           columns=columns,
+                                           filter_key=filter_key,
+                                           values=values, now=tuple(now))
+
+        response = self._command.execute_batch(sequel, self._connection,
+                                               page_size=page_size)
+
+        return response
+
+    @exception_handler()
+    @_pooled
     def delete(self, name: str, filter_key: str,
                filter_value: Union[str, float, int],
                schema: str = 'public') \
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# =========================================================================== #
+# Project  : Drug Approval Analytics                                          #
+# Version  : 0.1.0                                                            #
+# File     : \src\infrastructure\data\aio.py                                  #
+# Language : Python 3.9.5                                                     #
+# --------------------------------------------------------------------------  #
+# Author   : John James                                                       #
+# Company  : nov8.ai                                                          #
+# Email    : john.james@nov8.ai                                               #
+# URL      : https://github.com/john-james-sf/drug-approval-analytics         #
+# --------------------------------------------------------------------------  #
+# Created  : Thursday, August 19th 2021, 9:12:05 am                           #
+# Modified : Thursday, August 19th 2021, 9:12:05 am                           #
+# Modifier : John James (john.james@nov8.ai)                                  #
+# --------------------------------------------------------------------------- #
+# License  : BSD 3-clause "New" or "Revised" License                          #
+# Copyright: (c) 2021 nov8.ai                                                 #
+# =========================================================================== #
+"""Asynchronous data access object backed by asyncpg.
+
+asyncpg is imported when the first pool is created, so the synchronous
+psycopg2 API remains usable where asyncpg is not installed.
+"""
+import asyncio
+from functools import lru_cache
+import logging
+from typing import Union
+import uuid
+
+from .config import DBCredentials
+# --------------------------------------------------------------------------- #
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------------------------------- #
+def _identifier(name: str) -> str:
+    """Quotes an SQL identifier."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+@lru_cache(maxsize=256)
+def _insert_sql(name: str, schema: str, columns: tuple) -> str:
+    return "INSERT INTO {}.{} ({}) VALUES ({});".format(
+        _identifier(schema), _identifier(name),
+        ", ".join(map(_identifier, columns)),
+        ", ".join("${}".format(i + 1) for i in range(len(columns))))
+
+
+@lru_cache(maxsize=256)
+def _update_sql(name: str, schema: str, columns: tuple,
+                filter_key: str, now: tuple = ()) -> str:
+    assignments = ["{} = ${}".format(_identifier(column), i + 1)
+                   for i, column in enumerate(columns)]
+    assignments += ["{} = now()".format(_identifier(column))
+                    for column in now]
+    return "UPDATE {}.{} SET {} WHERE {} = ${};".format(
+        _identifier(schema), _identifier(name), ", ".join(assignments),
+        _identifier(filter_key), len(columns) + 1)
+
+
+# --------------------------------------------------------------------------- #
+#                     ASYNCHRONOUS DATA ACCESS OBJECT                         #
+# --------------------------------------------------------------------------- #
+class AsyncPGDao:
+    """Postgres data access object for use from asyncio coroutines.
+
+    Connections are drawn from an asyncpg pool shared by all AsyncPGDao
+    objects with the same credentials on the same event loop. asyncpg pools
+    are bound to the loop they were created on. Close them with close or
+    close_all before the loop ends; pools of loops found closed are dropped.
+
+    Arguments:
+        credentials (DBCredentials): Credentials including the database name.
+        mincon (int): Min connections in connection pool.
+        maxcon (int): Max connections in connection pool.
+
+    """
+
+    __pools = {}
+    __locks = {}
+
+    def __init__(self, credentials: DBCredentials, mincon: int = 2,
+                 maxcon: int = 10) -> None:
+        self._credentials = credentials
+        self._mincon = mincon
+        self._maxcon = maxcon
+
+    def _key(self) -> tuple:
+        return (self._credentials['dbname'], self._credentials['user'],
+                str(self._credentials['host']),
+                str(self._credentials['port']),
+                asyncio.get_running_loop())
+
+    async def _pool(self):
+        key = self._key()
+
+        for closed in [k for k in AsyncPGDao.__locks if k[-1].is_closed()]:
+            AsyncPGDao.__pools.pop(closed, None)
+            del AsyncPGDao.__locks[closed]
+
+        # Coroutines asking for a pool at once wait for the first to create
+        # it, rather than each creating one.
+        lock = AsyncPGDao.__locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in AsyncPGDao.__pools:
+                import asyncpg
+                AsyncPGDao.__pools[key] = await asyncpg.create_pool(
+                    user=self._credentials['user'],
+                    password=self._credentials['password'],
+                    host=self._credentials['host'],
+                    port=int(self._credentials['port']),
+                    database=self._credentials['dbname'],
+                    min_size=self._mincon, max_size=self._maxcon)
+
+                logger.info("Initialized asyncpg pool for {} database."
+                            .format(self._credentials['dbname']))
+
+        return AsyncPGDao.__pools[key]
+
+    async def close(self) -> None:
+        """Closes the pool for these credentials on the running loop."""
+        pool = AsyncPGDao.__pools.pop(self._key(), None)
+        if pool is not None:
+            await pool.close()
+            logger.info("Closed asyncpg pool for {} database.".format(
+                self._credentials['dbname']))
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """Closes every pool created on the running loop."""
+        loop = asyncio.get_running_loop()
+        for key in [key for key in cls.__pools if key[-1] is loop]:
+            await cls.__pools.pop(key).close()
+        logger.info("Closed asyncpg pools.")
+
+    async def create(self, name: str, columns: list, values: list,
+                     schema: str = 'public', id: str = None) -> str:
+        """Adds a row to the designated table.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of values corresponding with the columns.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            id (str): The id of the row. Optional. Generated if not
+                provided.
+
+        Returns:
+            status (str): The command status returned by the server.
+        """
+        pool = await self._pool()
+        return await pool.execute(
+            _insert_sql(name, schema, (*columns, 'id')),
+            *values, id or str(uuid.uuid4()))
+
+    async def create_many(self, name: str, columns: list, values: list,
+                          schema: str = 'public') -> str:
+        """Bulk loads rows through the binary COPY protocol.
+
+        Arguments
+
+            name (str): Name of table
+            columns (list): List of columns being inserted.
+            values (list): List of row tuples, each ordered as columns.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+
+        Returns:
+            status (str): The command status returned by the server.
+        """
+        pool = await self._pool()
+        async with pool.acquire() as connection:
+            return await connection.copy_records_to_table(
+                name, schema_name=schema, columns=[*columns, 'id'],
+                records=[(*row, str(uuid.uuid4())) for row in values])
+
+    async def update_many_columns(self, name: str, columns: list,
+                                  values: list, filter_key: str,
+                                  filter_value: Union[str, float, int],
+                                  schema: str = 'public',
+                                  now: list = ()) -> str:
+        """Updates several columns of a row in a single statement.
+
+        Arguments
+            name (str): Name of table
+            columns (list): The columns to update
+            values (list): The values to assign, in the order of columns.
+            filter_key (str): Column upon which the condition applies.
+            filter_value (Union[str, int, float]): Value to which
+                filter_key must match.
+            schema (str): The schema to which the table belongs.
+                Optional. Default='public'
+            now (list): Columns set to the server's now() rather than
+                to a value. Optional. Default=()
+
+        Returns:
+            status (str): The command status returned by the server.
+        """
+        pool = await self._pool()
+        return await pool.execute(
+            _update_sql(name, schema, tuple(columns), filter_key, tuple(now)),
+            *values, filter_value)
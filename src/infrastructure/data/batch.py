@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# =========================================================================== #
+# Project  : Drug Approval Analytics                                          #
+# Version  : 0.1.0                                                            #
+# File     : \src\infrastructure\data\batch.py                                #
+# Language : Python 3.9.5                                                     #
+# --------------------------------------------------------------------------  #
+# Author   : John James                                                       #
+# Company  : nov8.ai                                                          #
+# Email    : john.james@nov8.ai                                               #
+# URL      : https://github.com/john-james-sf/drug-approval-analytics         #
+# --------------------------------------------------------------------------  #
+# Created  : Wednesday, August 18th 2021, 11:02:14 am                         #
+# Modified : Wednesday, August 18th 2021, 11:02:14 am                         #
+# Modifier : John James (john.james@nov8.ai)                                  #
+# --------------------------------------------------------------------------- #
+# License  : BSD 3-clause "New" or "Revised" License                          #
+# Copyright: (c) 2021 nov8.ai                                                 #
+# =========================================================================== #
+"""Write batcher that group-commits concurrent write operations."""
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+
+from .access import PGDao
+from .config import DBCredentials
+# --------------------------------------------------------------------------- #
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------------------------------- #
+#                              WRITE BATCHER                                  #
+# --------------------------------------------------------------------------- #
+class WriteBatcher:
+    """Commits write operations from concurrent callers in shared transactions.
+
+    An operation is a callable that receives a PGDao and issues its writes
+    through it. A caller that finds no other writer in the critical section
+    runs its operation immediately in its own transaction. Under contention,
+    operations are queued and a single background writer drains up to
+    max_batch of them, or whatever arrives within max_wait seconds, and
+    commits them together in one transaction.
+
+    Arguments:
+        credentials (DBCredentials): Credentials including the database name.
+        max_batch (int): Maximum operations committed per transaction.
+        max_wait (float): Seconds the writer waits to fill a batch.
+
+    """
+
+    __batchers = {}
+    __batchers_lock = threading.Lock()
+
+    def __init__(self, credentials: DBCredentials, max_batch: int = 25,
+                 max_wait: float = 0.005) -> None:
+        self._dao = PGDao.from_pool(credentials=credentials, autocommit=False)
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    @staticmethod
+    def shared(credentials: DBCredentials):
+        """Returns the batcher shared by all writers on a database and user."""
+        key = (credentials['dbname'], credentials['user'],
+               str(credentials['host']), str(credentials['port']))
+        with WriteBatcher.__batchers_lock:
+            if key not in WriteBatcher.__batchers:
+                WriteBatcher.__batchers[key] = WriteBatcher(credentials)
+            return WriteBatcher.__batchers[key]
+
+    def execute(self, operation):
+        """Runs an operation in a transaction, batching under contention."""
+        if self._lock.acquire(blocking=False):
+            try:
+                future = Future()
+                self._commit([(operation, future)])
+            finally:
+                self._lock.release()
+            return future.result()
+        return self.submit(operation).result()
+
+    def submit(self, operation) -> Future:
+        """Queues an operation for the background writer."""
+        future = Future()
+        self._queue.put((operation, future))
+        self._start()
+        return future
+
+    def _start(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run,
+                                                name="WriteBatcher",
+                                                daemon=True)
+                self._writer.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._lock:
+                self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        """Replays a batch in one transaction and resolves its futures.
+
+        If the transaction fails, each operation is retried in a transaction
+        of its own so that one bad write does not fail the others.
+        """
+        try:
+            results = self._replay(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+            else:
+                for item in batch:
+                    self._commit([item])
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _replay(self, batch: list) -> list:
+        with self._dao.transaction() as dao:
+            results = [operation(dao) for operation, _ in batch]
+
+        logger.info("Committed {} operations.".format(len(batch)))
+        return results
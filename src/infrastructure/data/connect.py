@@ -41,6 +41,7 @@
 """Core internal Base, Connection, and ConnectionPool classes."""
 from abc import ABC, abstractmethod
 import logging
+import threading
 
 import psycopg2
 from psycopg2 import pool
@@ -93,9 +94,18 @@ class AbstractConnectionPool(ABC):
 #                    POSTGRES CONNECTION POOL CLASS                           #
 # --------------------------------------------------------------------------- #
 class PGConnectionPool(AbstractConnectionPool):
-    """Postgres database connection pool."""
+    """Postgres database connection pool.
+
+    Pools are created once per database and user, and shared by every
+    Connection opened with the same credentials. Borrowing from a pool
+    with every connection in use waits for one to be returned.
+    """
 
     __connection_pool = None
+    __key = None
+    __connection_pools = {}
+    __semaphores = {}
+    __lock = threading.Lock()
 
     @staticmethod
     @exception_handler()
@@ -111,17 +121,41 @@ class PGConnectionPool(AbstractConnectionPool):
             maxcon (int, optional): Max connections in connection pool.
                 Defaults to 10.
         """
-
-        PGConnectionPool.__connection_pool = pool.SimpleConnectionPool(
-            mincon, maxcon, **credentials)
-
-        logger.info("Initialized connection pool for {} database.".format(
-            credentials['dbname']))
+        key = PGConnectionPool._key(credentials)
+
+        if key not in PGConnectionPool.__connection_pools:
+            with PGConnectionPool.__lock:
+                if key not in PGConnectionPool.__connection_pools:
+                    # ThreadedConnectionPool raises rather than waits when
+                    # exhausted, so borrowers queue on a semaphore instead.
+                    PGConnectionPool.__semaphores[key] = \
+                        threading.BoundedSemaphore(maxcon)
+                    PGConnectionPool.__connection_pools[key] = \
+                        pool.ThreadedConnectionPool(mincon, maxcon,
+                                                    **credentials)
+
+                    logger.info("Initialized connection pool for {} "
+                                "database.".format(credentials['dbname']))
+
+        PGConnectionPool.__key = key
+        PGConnectionPool.__connection_pool = \
+            PGConnectionPool.__connection_pools[key]
 
     @staticmethod
     @exception_handler()
-    def get_connection():
-        con = PGConnectionPool.__connection_pool.getconn()
+    def get_connection(credentials: DBCredentials = None):
+        if credentials is not None:
+            key = PGConnectionPool._key(credentials)
+        else:
+            key = PGConnectionPool.__key
+        connection_pool = PGConnectionPool.__connection_pools[key]
+        semaphore = PGConnectionPool.__semaphores[key]
+        semaphore.acquire()
+        try:
+            con = connection_pool.getconn()
+        except Exception:
+            semaphore.release()
+            raise
         name = con.info.dsn_parameters['dbname']
         logger.info(
             "Getting connection from {} connection pool.".format(name))
@@ -133,12 +167,27 @@ class PGConnectionPool(AbstractConnectionPool):
         name = connection.info.dsn_parameters['dbname']
         logger.info(
             "Returning connection to {} connection pool.".format(name))
-        PGConnectionPool.__connection_pool.putconn(connection)
+        key = PGConnectionPool._key(connection.info.dsn_parameters)
+        PGConnectionPool.__connection_pools[key].putconn(connection)
+        PGConnectionPool.__semaphores[key].release()
 
     @staticmethod
     @exception_handler()
     def close_all_connections() -> None:
-        PGConnectionPool.__connection_pool.closeall()
+        with PGConnectionPool.__lock:
+            for connection_pool in \
+                    PGConnectionPool.__connection_pools.values():
+                connection_pool.closeall()
+            PGConnectionPool.__connection_pools = {}
+            PGConnectionPool.__semaphores = {}
+            PGConnectionPool.__connection_pool = None
+            PGConnectionPool.__key = None
+
+    @staticmethod
+    def _key(credentials) -> tuple:
+        """Identifies a pool by database, user, host and port."""
+        return (credentials['dbname'], credentials['user'],
+                str(credentials['host']), str(credentials['port']))
 
 
 # --------------------------------------------------------------------------- #
@@ -214,6 +263,12 @@ class SAConnectionPool(AbstractConnectionPool):
 class Connection:
     """Encapsulates a connection pool and the behavior of its connections.
 
+    Postgres connections are borrowed from the pool when first used and
+    returned by close(), so a Connection holds no pool slot while idle.
+    Each thread borrows its own connection, so a Connection shared by
+    threads never hands one thread's connection, or its transaction, to
+    another.
+
     Arguments:
         credentials (DBCredentials): Credentials including the database name.
 
@@ -228,10 +283,10 @@ class Connection:
         self._credentials = credentials
         self._autocommit = autocommit
         self._postgres = postgres
+        self._local = threading.local()
 
         if postgres:
             PGConnectionPool.initialize(credentials)
-            self._connection = self._get_connection(autocommit)
         else:
             SAConnectionPool.initialize(credentials)
             self._connection = self._get_connection()
@@ -239,6 +294,22 @@ class Connection:
     def __del__(self):
         self.close()
 
+    @property
+    def _connection(self):
+        return getattr(self._local, 'connection', None)
+
+    @_connection.setter
+    def _connection(self, connection) -> None:
+        self._local.connection = connection
+
+    @property
+    def _in_transaction(self) -> bool:
+        return getattr(self._local, 'in_transaction', False)
+
+    @_in_transaction.setter
+    def _in_transaction(self, in_transaction: bool) -> None:
+        self._local.in_transaction = in_transaction
+
     def __enter__(self):
         self.begin_transaction()
         return self
@@ -248,19 +319,27 @@ class Connection:
 
     def _get_connection(self, autocommit=True):
         if self._postgres:
-            connection = PGConnectionPool.get_connection()
+            PGConnectionPool.initialize(self._credentials)
+            connection = PGConnectionPool.get_connection(self._credentials)
             connection.set_session(autocommit=autocommit)
 
         else:
             connection = SAConnectionPool.get_connection()
         return connection
 
+    def connect(self):
+        """Borrows a connection from the pool if none is held."""
+        if self._connection is None:
+            self._connection = self._get_connection(self._autocommit)
+
     def begin_transaction(self):
         self.close()
         self._connection = self._get_connection(autocommit=False)
+        self._in_transaction = True
 
     def commit(self):
         self._connection.commit()
+        self._in_transaction = False
 
     def close(self):
         if self._connection is not None:
@@ -268,9 +347,27 @@ class Connection:
                 PGConnectionPool.close(self._connection)
             else:
                 SAConnectionPool.close(self._connection)
+            self._connection = None
+        self._in_transaction = False
 
     def rollback(self):
         self._connection.rollback()
+        self._in_transaction = False
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether this thread has begun a transaction that is open."""
+        return self._in_transaction
+
+    @property
+    def credentials(self) -> DBCredentials:
+        return self._credentials
+
+    @property
+    def connection(self):
+        """The underlying connection borrowed from the pool."""
+        self.connect()
+        return self._connection
 
     @property
     def dbname(self):
@@ -282,6 +379,7 @@ class Connection:
 
     @property
     def cursor(self):
+        self.connect()
         if self._postgres:
             return self._connection.cursor
         else:
@@ -24,6 +24,7 @@ import logging
 
 import psycopg2
 from psycopg2 import pool
+from psycopg2 import extras
 
 
 from .sequel import DatabaseSequel, TableSequel, UserSequel, SchemaSequel
@@ -882,6 +883,42 @@ class Database(ABC):
         logger.info(sequel.description)
         return response
 
+    @exception_handler()
+    def execute_values(self, sequel: Sequel, connection: Connection,
+                       page_size: int = 1000,
+                       template: bytes = None) -> Response:
+        """Executes a multi-row statement, one page of rows per round-trip."""
+        cursor = connection.cursor()
+        extras.execute_values(cursor, sequel.cmd, sequel.params,
+                              template=template, page_size=page_size)
+        response = Response(cursor=cursor, rowcount=len(sequel.params))
+        cursor.close()
+        logger.info(sequel.description)
+        return response
+
+    @exception_handler()
+    def execute_batch(self, sequel: Sequel, connection: Connection,
+                      page_size: int = 500) -> Response:
+        """Executes a statement once per parameter row, a page at a time."""
+        cursor = connection.cursor()
+        extras.execute_batch(cursor, sequel.cmd, sequel.params,
+                             page_size=page_size)
+        response = Response(cursor=cursor, rowcount=len(sequel.params))
+        cursor.close()
+        logger.info(sequel.description)
+        return response
+
+    @exception_handler()
+    def execute_copy(self, sequel: Sequel, connection: Connection,
+                     file) -> Response:
+        """Streams a file-like object through a COPY statement."""
+        cursor = connection.cursor()
+        cursor.copy_expert(sequel.cmd, file)
+        response = Response(cursor=cursor, rowcount=cursor.rowcount)
+        cursor.close()
+        logger.info(sequel.description)
+        return response
+
     @exception_handler()
     def execute_ddl(self, sequel: Sequel, connection: Connection) -> None:
         """Processes SQL DDL commands from file."""
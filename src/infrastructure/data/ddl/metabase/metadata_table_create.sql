@@ -46,14 +46,15 @@ creator varchar(256) NOT NULL,
 maintainer varchar(256),
 has_changed boolean NOT NULL,
 source_updated timestamp with time zone,
-created timestamp with time zone NOT NULL,
+created timestamp with time zone NOT NULL DEFAULT now(),
 created_by varchar(32) NOT NULL,
 updated timestamp with time zone,
 updated_by varchar(24),
 extracted timestamp with time zone,
 last_extract date,
 next_extract date,
-PRIMARY KEY (id)
+PRIMARY KEY (id),
+UNIQUE (name)
 );
 
 
@@ -182,10 +183,29 @@ started timestamp with time zone NOT NULL,
 ended timestamp with time zone NOT NULL,
 return_code integer NOT NULL,
 return_value varchar(256) NOT NULL,
-created timestamp with time zone NOT NULL,
+created timestamp with time zone NOT NULL DEFAULT now(),
 created_by varchar(24) NOT NULL,
-PRIMARY KEY (id)
-);
+PRIMARY KEY (id, created)
+) PARTITION BY RANGE (created);
+
+COMMENT ON TABLE metabase.datasourceevent
+IS 'Partitioned daily on created. The current day is UNLOGGED until rotated.';
+
+CREATE TABLE metabase.datasourceevent_default
+PARTITION OF metabase.datasourceevent DEFAULT;
+
+-- Daily partitions for today and the following week. DataSourceEvent.rotate
+-- keeps them ahead, so events only land in the default partition when
+-- rotation is missed.
+DO $$
+BEGIN
+FOR i IN 0..7 LOOP
+EXECUTE format('CREATE UNLOGGED TABLE IF NOT EXISTS metabase.%I
+PARTITION OF metabase.datasourceevent FOR VALUES FROM (%L) TO (%L)',
+'datasourceevent_' || to_char(current_date + i, 'YYYYMMDD'),
+current_date + i, current_date + i + 1);
+END LOOP;
+END $$;
 
 CREATE INDEX ON metabase.datasourceevent
 (datasource_id);
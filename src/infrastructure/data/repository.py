@@ -21,54 +21,97 @@
 # %%
 """Repository of Metadata."""
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import logging
-from types import Union
-import pandas as pd
-
-from ..platform.database.connect import PGConnectionPool
-from ..platform.database.context import PGDao
-from ..platform.database.connect import ConnectionFactory
-from ..platformsrc.infrastructure.data.config import rx2m_login, DBCredentials
+from typing import TYPE_CHECKING, Union
+import uuid
+
+from .access import PGDao
+from .aio import AsyncPGDao
+from .batch import WriteBatcher
+from .config import DBCredentials
+from .sequel import AccessSequel, Sequel, TableSequel
+from ...utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    import pandas as pd
 # --------------------------------------------------------------------------- #
 logger = logging.getLogger(__name__)
+# --------------------------------------------------------------------------- #
+# Datasource columns in the order create takes them, with created last so
+# that rows the server stamps drop only the final column. The insert
+# statements for both column sets are built once, here.
+_DS_COLUMNS = ("name", "type", "version", "webpage",
+               "link", "link_type", "frequency", "lifecycle", "creator",
+               "has_changed", "source_updated", "created_by", "title",
+               "description", "coverage", "maintainer")
+_DS_INSERT = AccessSequel._insert_cmd(
+    'datasource', 'public', (*_DS_COLUMNS, 'created', 'id'))
+_DS_INSERT_NOW = AccessSequel._insert_cmd(
+    'datasource', 'public', (*_DS_COLUMNS, 'id'))
 
 
 # --------------------------------------------------------------------------- #
-#                              REPOSITORY                                     #
+#                           REPOSITORY BASE                                   #
 # --------------------------------------------------------------------------- #
-class Repository(ABC):
+class _RepositoryBase(ABC):
+    """Data access shared by artifact and event repositories.
 
-    def __init__(self, context: Context) -> None:
-        self._context = context
-        self._data = None
-        self._index = 0
+    Subclasses set self._table. The DAO runs on a pooled connection and the
+    write batcher is shared by all repositories on the same database.
+    """
 
-    @abstractmethod
-    def __next__(self):
+    def __init__(self, credentials: DBCredentials, autocommit=False,
+                 *args, **kwargs) -> None:
+        self._credentials = credentials
+        self._autocommit = autocommit
+        self._dao = PGDao.from_pool(credentials=credentials,
+                                    autocommit=autocommit)
+        self._batcher = WriteBatcher.shared(credentials)
+        self._async_dao = AsyncPGDao(credentials)
+        self._schema = 'public'
+
+    def _write(self, operation):
+        """Runs a write operation and returns its result once committed.
+
+        The operation receives the PGDao to write through. In autocommit
+        mode it runs on the repository DAO, each statement committing as it
+        executes. Otherwise it runs in a transaction of the write batcher.
+        """
+        if self._autocommit:
+            return operation(self._dao)
+        return self._batcher.execute(operation)
+
+
+# --------------------------------------------------------------------------- #
+#                              ARTIFACTS                                      #
+# --------------------------------------------------------------------------- #
+class Artifact(_RepositoryBase):
 
     @abstractmethod
-    def get(self, name: str, *args, **kwargs) -> pd.DataFrame:
+    def create(self, name: str, *args, **kwargs) -> None:
         pass
 
     @abstractmethod
-    def add(self, entity: Entity) -> None:
+    def read(self, name: str = None, *args, **kwargs) -> \
+            "pd.DataFrame":
         pass
 
     @abstractmethod
-    def update(self, entity: Entity) -> None:
+    def update(self, name: str, *args, **kwargs) -> None:
         pass
 
     @abstractmethod
-    def remove(self, name: str, *args, **kwargs) -> None:
+    def delete(self, name: str, *args, **kwargs) -> None:
         pass
 
 
 # --------------------------------------------------------------------------- #
-
-
 class DataSource(Artifact):
 
+    # Single row reads by name, shared by all DataSource instances.
+    _cache = TTLCache(maxsize=512, ttl=30)
+
     def __init__(self, credentials: DBCredentials,
                  autocommit: bool = False) -> None:
         super(DataSource, self).__init__(credentials=credentials,
@@ -87,92 +130,291 @@ class DataSource(Artifact):
                creator: int,
                has_changed: bool,
                source_updated: datetime,
-               created: datetime,
+               created: Union[datetime, None],
                created_by: str,
                title: str = None,
                description: str = None,
                coverage: str = None,
                maintainer: str = None,
-               **kwargs) -> None:
-
-        columns = ["name", "source_type", "version", "webpage",
-                   "link", "link_type", "frequency", "lifecycle", "creator",
-                   "has_changed", "source_updated", "created", "created_by",
-                   "title", "description", "coverage", "maintainer"]
-
-        values = [name, source_type, version, webpage,
+               **kwargs) -> str:
+        """Adds a datasource and returns its id.
+
+        The id is generated here rather than by the server, so callers can
+        hold it as a handle for updates by primary key without a RETURNING
+        round trip.
+        """
+        id = str(uuid.uuid4())
+        values = (name, source_type, version, webpage,
                   link, link_type, frequency, lifecycle, creator,
-                  has_changed, source_updated, created, created_by,
-                  title, description, coverage, maintainer]
-
-        for k, v in kwargs.items():
-            columns.append(k)
-            values.append(v)
-        self._dao.create(table=self._table, columns=columns, values=values,
-                         schema=self._schema)
-
-    def read(self, name: str = None) -> pd.DataFrame:
+                  has_changed, source_updated, created_by,
+                  title, description, coverage, maintainer)
+
+        # Without a created timestamp the server stamps the row itself.
+        if kwargs:
+            if created is not None:
+                kwargs['created'] = created
+            sequel = AccessSequel().create(
+                name=self._table, schema=self._schema,
+                columns=(*_DS_COLUMNS, *kwargs, 'id'),
+                values=(*values, *kwargs.values(), id))
+        else:
+            if created is None:
+                cmd, params = _DS_INSERT_NOW, (*values, id)
+            else:
+                cmd, params = _DS_INSERT, (*values, created, id)
+            sequel = Sequel(name="insert", cmd=cmd, params=params,
+                            description="Inserted into datasource",
+                            query_context='access', object_type='table',
+                            object_name=self._table)
+        self._write(lambda dao: dao.execute(sequel))
+        self._invalidate(name)
+        return id
+
+    def create_many(self, rows: list) -> None:
+        """Inserts datasource dictionaries, one statement per column set."""
+        def operation(dao):
+            for columns, values in self._to_records(rows):
+                dao.create_many(name=self._table, columns=columns,
+                                values=values, schema=self._schema)
+
+        self._write(operation)
+        DataSource._cache.clear()
+
+    def create_copy(self, rows: list) -> None:
+        """Bulk loads a list of datasource dictionaries via COPY."""
+        def operation(dao):
+            for columns, values in self._to_records(rows):
+                dao.create_copy(name=self._table, columns=columns,
+                                values=values, schema=self._schema)
+
+        self._write(operation)
+        DataSource._cache.clear()
+
+    def upsert(self, name: str, **fields) -> None:
+        """Creates the named datasource or replaces it with the fields given.
+
+        The fields must include every NOT NULL column of the datasource
+        without a default, as for create. Use update to change some columns
+        of an existing datasource.
+        """
+        self._write(lambda dao: dao.upsert(
+            name=self._table, columns=('name', *fields),
+            values=(name, *fields.values()), conflict_key='name',
+            schema=self._schema))
+        self._invalidate(name)
+
+    def upsert_many(self, rows: list) -> None:
+        """Upserts datasource dictionaries in a single transaction."""
+        def operation(dao):
+            for columns, values in self._to_records(rows):
+                dao.upsert_many(name=self._table, columns=columns,
+                                values=values, conflict_key='name',
+                                schema=self._schema)
+
+        self._write(operation)
+        DataSource._cache.clear()
+
+    async def acreate(self,
+                      name: str,
+                      source_type: str,
+                      version: int,
+                      webpage: str,
+                      link: str,
+                      link_type: str,
+                      frequency: int,
+                      lifecycle: int,
+                      creator: int,
+                      has_changed: bool,
+                      source_updated: datetime,
+                      created: Union[datetime, None],
+                      created_by: str,
+                      title: str = None,
+                      description: str = None,
+                      coverage: str = None,
+                      maintainer: str = None,
+                      **kwargs) -> str:
+        """Adds a datasource from a coroutine and returns its id, as create."""
+        id = str(uuid.uuid4())
+        columns = (*_DS_COLUMNS, *kwargs)
+        values = (name, source_type, version, webpage,
+                  link, link_type, frequency, lifecycle, creator,
+                  has_changed, source_updated, created_by,
+                  title, description, coverage, maintainer, *kwargs.values())
+
+        # Without a created timestamp the server stamps the row itself.
+        if created is not None:
+            columns, values = (*columns, 'created'), (*values, created)
+        await self._async_dao.create(name=self._table, columns=columns,
+                                     values=values, schema=self._schema,
+                                     id=id)
+        self._invalidate(name)
+        return id
+
+    async def acreate_many(self, rows: list) -> None:
+        """Bulk loads a list of datasource dictionaries from a coroutine."""
+        for columns, values in self._to_records(rows):
+            await self._async_dao.create_many(name=self._table,
+                                              columns=columns, values=values,
+                                              schema=self._schema)
+        DataSource._cache.clear()
+
+    def _to_records(self, rows: list) -> list:
+        """Groups rows by the columns they give.
+
+        Returns a list of (columns, row tuples), one per column set. A
+        column a row leaves out is not written as NULL, so column defaults
+        such as created's apply.
+        """
+        groups = {}
+        for row in rows:
+            columns, values = groups.setdefault(frozenset(row),
+                                                (tuple(row), []))
+            values.append(tuple(row[c] for c in columns))
+        return list(groups.values())
+
+    def read(self, name: str = None) -> "pd.DataFrame":
         if name is not None:
-            result = self._dao.read(table=self._table,
-                                    filter_key='name',
-                                    filter_value=name,
-                                    schema=self._schema)
+            result = self._cached_read_by_name(name).copy()
         else:
-            result = self._dao.read(table=self._table,
-                                    schema=self._schema)
+            result = self._dao.read_copy(name=self._table,
+                                         schema=self._schema)
         return result
 
-    def update(self, name: str, version: int, uris: list,
+    def read_iter(self, chunksize: int = 10_000):
+        """Yields each datasource as a dictionary, chunksize rows at a time."""
+        return self._dao.iter_read(name=self._table, schema=self._schema,
+                                   chunksize=chunksize)
+
+    def read_one(self, name: str) -> dict:
+        """Returns the datasource as a dictionary, or None if not found."""
+        return self._dao.fetchone_dict(name=self._table, filter_key='name',
+                                       filter_value=name, schema=self._schema)
+
+    def update(self, name: Union[str, None], version: int, uris: list,
                has_changed: bool, source_updated: datetime,
-               updated: datetime, updated_by: str) -> None:
-
-        self._dao.connect()
-        self._dao.begin()
-        self._dao.update(table=self._table, column='uris', value=uris,
-                         filter_key='name', filter_value=name,
-                         schema=self._schema)
-        self._dao.update(table=self._table, column='has_changed',
-                         value=has_changed,
-                         filter_key='name', filter_value=name,
-                         schema=self._schema)
-        self._dao.update(table=self._table, column='source_updated',
-                         value=source_updated,
-                         filter_key='name', filter_value=name,
-                         schema=self._schema)
-        self._dao.update(table=self._table, column='updated',
-                         value=updated,
-                         filter_key='name', filter_value=name,
-                         schema=self._schema)
-        self._dao.update(table=self._table, column='updated_by',
-                         value=updated_by,
-                         filter_key='name', filter_value=name,
-                         schema=self._schema)
-        self._dao.commit()
-        self._dao.close()
+               updated: Union[datetime, None], updated_by: str,
+               id: str = None) -> None:
+        """Updates a datasource by id if given, otherwise by name.
+
+        Updating by id probes the primary key. Passing the name as well
+        lets just that entry be evicted from the read cache; without it
+        the cache is cleared.
+        """
+        update = self._update_args(name, version, uris, has_changed,
+                                   source_updated, updated, updated_by, id)
+        self._write(lambda dao: dao.update_many_columns(
+            name=self._table, schema=self._schema, **update))
+        self._invalidate(name)
+
+    async def aupdate(self, name: Union[str, None], version: int,
+                      uris: list, has_changed: bool,
+                      source_updated: datetime,
+                      updated: Union[datetime, None], updated_by: str,
+                      id: str = None) -> None:
+        """Coroutine counterpart of update."""
+        update = self._update_args(name, version, uris, has_changed,
+                                   source_updated, updated, updated_by, id)
+        await self._async_dao.update_many_columns(
+            name=self._table, schema=self._schema, **update)
+        self._invalidate(name)
+
+    def update_many(self, updates: list) -> None:
+        """Applies a list of updates in a single transaction.
+
+        Each dictionary holds the keyword arguments of update; name, updated
+        and id may be left out. Updates setting the same columns by the same
+        key are sent a page per round-trip.
+        """
+        batches = {}
+        for update in updates:
+            update = self._update_args(**{'name': None, 'updated': None,
+                                          **update})
+            key = (update['filter_key'], tuple(update['columns']),
+                   tuple(update['now']))
+            batches.setdefault(key, []).append(
+                (*update['values'], update['filter_value']))
+
+        def operation(dao):
+            for (filter_key, columns, now), values in batches.items():
+                dao.update_batch(name=self._table, columns=columns,
+                                 values=values, filter_key=filter_key,
+                                 schema=self._schema, now=now)
+
+        self._write(operation)
+        for update in updates:
+            self._invalidate(update.get('name'))
+
+    def _update_args(self, name: Union[str, None], version: int, uris: list,
+                     has_changed: bool, source_updated: datetime,
+                     updated: Union[datetime, None], updated_by: str,
+                     id: str = None) -> dict:
+        """Returns the PGDao.update_many_columns arguments of an update."""
+        filter_key, filter_value = self._key(name, id)
+
+        columns = ['uris', 'has_changed', 'source_updated', 'updated_by']
+        values = [uris, has_changed, source_updated, updated_by]
+        now = []
+        # Without an updated timestamp the server stamps it with now().
+        if updated is None:
+            now.append('updated')
+        else:
+            columns.append('updated')
+            values.append(updated)
+
+        return {'columns': columns, 'values': values,
+                'filter_key': filter_key, 'filter_value': filter_value,
+                'now': now}
 
     def delete(self, name) -> None:
-        self._dao.delete(table=self._table, filter_key='name', filter_value=name,
-                         schema=self._schema)
+        self._write(lambda dao: dao.delete(
+            name=self._table, filter_key='name', filter_value=name,
+            schema=self._schema))
+        self._invalidate(name)
+
+    def _cached_read_by_name(self, name: str) -> "pd.DataFrame":
+        key = (self._credentials['dbname'], self._schema, name)
+        result = DataSource._cache.get(key)
+        if result is None:
+            result = self._dao.read_prepared(name=self._table,
+                                             filter_key='name',
+                                             filter_value=name,
+                                             schema=self._schema)
+            DataSource._cache.set(key, result)
+        return result
+
+    def _key(self, name: str, id: str) -> tuple:
+        """Returns the column and value identifying a datasource."""
+        if id is not None:
+            return 'id', id
+        if name is None:
+            raise ValueError("Either name or id must be provided.")
+        return 'name', name
+
+    def _invalidate(self, name: str) -> None:
+        if name is None:
+            DataSource._cache.clear()
+        else:
+            DataSource._cache.invalidate(
+                (self._credentials['dbname'], self._schema, name))
 
 
 # --------------------------------------------------------------------------- #
 #                              EVENTS                                         #
 # --------------------------------------------------------------------------- #
-class Event(ABC):
+class Event(_RepositoryBase):
 
     def __init__(self, credentials: DBCredentials, autocommit=True,
                  *args, **kwargs) -> None:
-        self._credentials = credentials
-        self._dao = PGDao(credentials=credentials, autocommit=autocommit)
-        self._schema = 'public'
+        super(Event, self).__init__(credentials=credentials,
+                                    autocommit=autocommit)
 
     @abstractmethod
-    def add(self, name: str, *args, **kwargs) -> None:
+    def create(self, *args, **kwargs) -> None:
         pass
 
     @abstractmethod
     def read(self, name: str = None, *args, **kwargs) -> \
-            pd.DataFrame:
+            "pd.DataFrame":
         pass
 
     @abstractmethod
@@ -183,24 +425,107 @@ class Event(ABC):
 # --------------------------------------------------------------------------- #
 class DataSourceEvent(Event):
 
+    # Days of partitions rotate keeps ready after the current day.
+    _ahead = 7
+
     def __init__(self, credentials: DBCredentials) -> None:
         super(DataSourceEvent, self).__init__(credentials=credentials)
         self._table = 'datasourceevent'
 
     def create(self, **kwargs) -> None:
-        columns = [k for k in kwargs.keys()]
-        values = [v for v in kwargs.values()]
-
-        self._dao.create(table=self._table, columns=columns, values=values,
-                         schema=self._schema)
-
-    def read(self, name: str = None) -> pd.DataFrame:
-        if name is None:
-            df = self._dao.read(table=self._table)
+        columns = tuple(kwargs)
+        values = tuple(kwargs.values())
+
+        self._batcher.execute(lambda dao: dao.create(
+            name=self._table, columns=columns, values=values,
+            schema=self._schema))
+
+    async def acreate(self, **kwargs) -> None:
+        """Records an event from a coroutine."""
+        await self._async_dao.create(name=self._table, columns=tuple(kwargs),
+                                     values=tuple(kwargs.values()),
+                                     schema=self._schema)
+
+    def read(self, name: str = None,
+             datasource_id: str = None) -> "pd.DataFrame":
+        if datasource_id is not None:
+            df = self._dao.read(name=self._table, filter_key="datasource_id",
+                                filter_value=datasource_id)
+        elif name is None:
+            df = self._dao.read(name=self._table)
         else:
-            df = self._dao.read(table=self._table,
+            df = self._dao.read(name=self._table,
                                 filter_key="name", filter_value=name)
         return df
 
-    def delete(self, id: int = None) -> pd.DataFrame:
-        self._dao.delete(table=self._table, filter_key="id", filter_value=id)
+    def read_one(self, name: str = None, datasource_id: str = None) -> dict:
+        """Returns the first event for the datasource as a dictionary.
+
+        Events are looked up by datasource_id when given, using its index,
+        otherwise by name.
+        """
+        if datasource_id is not None:
+            filter_key, filter_value = 'datasource_id', datasource_id
+        else:
+            filter_key, filter_value = 'name', name
+        return self._dao.fetchone_dict(name=self._table, filter_key=filter_key,
+                                       filter_value=filter_value,
+                                       schema=self._schema)
+
+    def delete(self, id: int = None) -> "pd.DataFrame":
+        self._write(lambda dao: dao.delete(
+            name=self._table, filter_key="id", filter_value=id,
+            schema=self._schema))
+
+    def rotate(self, day: date = None) -> None:
+        """Rolls the daily partitions of the event table forward.
+
+        Events are written to UNLOGGED daily partitions, which skip the
+        write-ahead log. Rotation ensures the partitions for day and the
+        following week exist, and makes the partitions of earlier days
+        LOGGED and therefore crash safe. Events that fell into the default
+        partition, because rotation was missed, are moved into partitions
+        of their own days. Run it once a day.
+
+        Arguments:
+            day (date): The current day. Optional. Defaults to today.
+        """
+        day = day or date.today()
+        sequel = TableSequel()
+        default = "{}_default".format(self._table)
+
+        with self._dao.transaction() as dao:
+            # A range partition can't be created while the default partition
+            # holds rows in its range, so the default is detached until they
+            # are moved.
+            missed = [row[0] for row in dao.execute(sequel.dates(
+                name=default, schema=self._schema, column='created')).fetchall]
+            if missed:
+                dao.execute(sequel.detach_partition(
+                    name=self._table, schema=self._schema,
+                    partition=default))
+
+            ahead = (day + timedelta(days=i) for i in range(self._ahead + 1))
+            for start in sorted({*missed, *ahead}):
+                dao.execute(sequel.create_partition(
+                    name=self._table, schema=self._schema,
+                    partition=self._partition(start),
+                    start=start, end=start + timedelta(days=1),
+                    unlogged=start >= day))
+
+            if missed:
+                dao.execute(sequel.move_rows(name=self._table,
+                                             schema=self._schema,
+                                             source=default))
+                dao.execute(sequel.attach_default_partition(
+                    name=self._table, schema=self._schema,
+                    partition=default))
+
+            for partition, in dao.execute(sequel.unlogged_partitions(
+                    name=self._table, schema=self._schema)).fetchall:
+                if partition < self._partition(day):
+                    dao.execute(sequel.set_logged(name=partition,
+                                                  schema=self._schema))
+
+    def _partition(self, day: date) -> str:
+        return "{}_{}".format(self._table, day.strftime("%Y%m%d"))
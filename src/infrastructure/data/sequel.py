@@ -23,6 +23,7 @@
 """
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Union
 
 from psycopg2 import sql
@@ -80,10 +81,6 @@ class AccessSequelBase(ABC):
     def create(self, name: str, *args, **kwargs) -> Sequel:
         pass
 
-    @abstractmethod
-    def update(self, name: str, *args, **kwargs) -> Sequel:
-        pass
-
     @abstractmethod
     def delete(self, name: str, *args, **kwargs) -> Sequel:
         pass
@@ -362,6 +359,152 @@ class TableSequel(AdminSequelBase):
 
         return sequel
 
+    def create_partition(self, name: str, schema: str, partition: str,
+                         start, end, unlogged: bool = True) -> Sequel:
+
+        sequel = Sequel(
+            name="create_partition",
+            description="Created {}partition {}.{} of {} from {} to {}"
+            .format("unlogged " if unlogged else "", schema, partition,
+                    name, start, end),
+            query_context='admin',
+            object_type='table',
+            object_name=partition,
+            cmd=sql.SQL("""CREATE {} TABLE IF NOT EXISTS {}.{}
+                        PARTITION OF {}.{}
+                        FOR VALUES FROM ({}) TO ({});""").format(
+                sql.SQL("UNLOGGED" if unlogged else ""),
+                sql.Identifier(schema),
+                sql.Identifier(partition),
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.Literal(start),
+                sql.Literal(end)
+            )
+        )
+
+        return sequel
+
+    def set_logged(self, name: str, schema: str) -> Sequel:
+
+        sequel = Sequel(
+            name="set_logged",
+            description="Set table {}.{} logged".format(schema, name),
+            query_context='admin',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("ALTER TABLE IF EXISTS {}.{} SET LOGGED;").format(
+                sql.Identifier(schema),
+                sql.Identifier(name)
+            )
+        )
+
+        return sequel
+
+    def detach_partition(self, name: str, schema: str,
+                         partition: str) -> Sequel:
+
+        sequel = Sequel(
+            name="detach_partition",
+            description="Detached partition {}.{} from {}".format(
+                schema, partition, name),
+            query_context='admin',
+            object_type='table',
+            object_name=partition,
+            cmd=sql.SQL("ALTER TABLE {}.{} DETACH PARTITION {}.{};").format(
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.Identifier(schema),
+                sql.Identifier(partition)
+            )
+        )
+
+        return sequel
+
+    def attach_default_partition(self, name: str, schema: str,
+                                 partition: str) -> Sequel:
+
+        sequel = Sequel(
+            name="attach_default_partition",
+            description="Attached {}.{} as default partition of {}".format(
+                schema, partition, name),
+            query_context='admin',
+            object_type='table',
+            object_name=partition,
+            cmd=sql.SQL("""ALTER TABLE {}.{}
+                        ATTACH PARTITION {}.{} DEFAULT;""").format(
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.Identifier(schema),
+                sql.Identifier(partition)
+            )
+        )
+
+        return sequel
+
+    def move_rows(self, name: str, schema: str, source: str) -> Sequel:
+
+        sequel = Sequel(
+            name="move_rows",
+            description="Moved rows of {}.{} into {}".format(
+                schema, source, name),
+            query_context='admin',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("""WITH moved AS (DELETE FROM {}.{} RETURNING *)
+                        INSERT INTO {}.{} SELECT * FROM moved;""").format(
+                sql.Identifier(schema),
+                sql.Identifier(source),
+                sql.Identifier(schema),
+                sql.Identifier(name)
+            )
+        )
+
+        return sequel
+
+    def dates(self, name: str, schema: str, column: str) -> Sequel:
+
+        sequel = Sequel(
+            name="dates",
+            description="Selected the dates of {} in {}.{}".format(
+                column, schema, name),
+            query_context='admin',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("SELECT DISTINCT {}::date FROM {}.{};").format(
+                sql.Identifier(column),
+                sql.Identifier(schema),
+                sql.Identifier(name)
+            )
+        )
+
+        return sequel
+
+    def unlogged_partitions(self, name: str, schema: str) -> Sequel:
+
+        sequel = Sequel(
+            name="unlogged_partitions",
+            description="Selected the unlogged partitions of {}.{}".format(
+                schema, name),
+            query_context='admin',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("""SELECT child.relname FROM pg_inherits
+                        JOIN pg_class child ON child.oid = inhrelid
+                        JOIN pg_class parent ON parent.oid = inhparent
+                        JOIN pg_namespace ON pg_namespace.oid =
+                            parent.relnamespace
+                        WHERE parent.relname = {}
+                        AND pg_namespace.nspname = {}
+                        AND child.relpersistence = 'u';""").format(
+                sql.Placeholder(),
+                sql.Placeholder()
+            ),
+            params=(name, schema)
+        )
+
+        return sequel
+
     def tables(self, schema: str = 'public') -> Sequel:
         sequel = Sequel(
             name="tables",
@@ -470,6 +613,9 @@ class UserSequel(AdminSequelBase):
 # =========================================================================== #
 class AccessSequel(AccessSequelBase):
 
+    # Marks NULL in COPY CSV, so that NULL and '' stay distinct.
+    copy_null = '\\N'
+
     def _get(self, name: str, schema: str, columns: list = None,
              filter_key: str = None,
              filter_value: Union[str, int, float] = None)\
@@ -605,43 +751,245 @@ class AccessSequel(AccessSequelBase):
             query_context='access',
             object_type='table',
             object_name=name,
-            cmd=sql.SQL("INSERT into {}.{} ({}) values ({});")
+            cmd=self._insert_cmd(name, schema, tuple(columns)),
+            params=(*values,)
+        )
+
+        return sequel
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _insert_cmd(name: str, schema: str, columns: tuple) -> sql.Composed:
+        """Returns the INSERT statement for a table and column set."""
+        return sql.SQL("INSERT into {}.{} ({}) values ({});").format(
+            sql.Identifier(schema),
+            sql.Identifier(name),
+            sql.SQL(', ').join(map(sql.Identifier, columns)),
+            sql.SQL(', ').join(sql.Placeholder() * len(columns))
+        )
+
+    def create_many(self, name: str, schema: str, columns: list,
+                    values: list) -> Sequel:
+
+        if any(len(columns) != len(row) for row in values):
+            raise ValueError(
+                "Number of columns doesn't match number of values")
+
+        sequel = Sequel(
+            name="insert_many",
+            description="Inserted {} rows into {}.{} {}".format(
+                len(values), schema, name, columns
+            ),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("INSERT into {}.{} ({}) values %s;")
             .format(
                 sql.Identifier(schema),
                 sql.Identifier(name),
-                sql.SQL(', ').join(map(sql.Identifier, tuple((*columns,)))),
-                sql.SQL(', ').join(sql.Placeholder() * len(columns))
+                sql.SQL(', ').join(map(sql.Identifier, tuple((*columns,))))
             ),
+            params=values
+        )
+
+        return sequel
+
+    def upsert(self, name: str, schema: str, columns: list, values: list,
+               conflict_key: str) -> Sequel:
+
+        if (len(columns) != len(values)):
+            raise ValueError(
+                "Number of columns doesn't match number of values")
+
+        sequel = Sequel(
+            name="upsert",
+            description="Upserted into {}.{} {} on {}".format(
+                schema, name, columns, conflict_key
+            ),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=self._upsert_cmd(name, schema, tuple(columns), conflict_key),
             params=(*values,)
         )
 
         return sequel
 
-    def update(self, name: str, schema: str, column: str,
-               value: Union[str, float, int], filter_key: str,
-               filter_value: Union[str, float, int]) -> Sequel:
+    def upsert_many(self, name: str, schema: str, columns: list,
+                    values: list, conflict_key: str) -> Sequel:
+
+        if any(len(columns) != len(row) for row in values):
+            raise ValueError(
+                "Number of columns doesn't match number of values")
+
+        sequel = Sequel(
+            name="upsert_many",
+            description="Upserted {} rows into {}.{} {} on {}".format(
+                len(values), schema, name, columns, conflict_key
+            ),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=self._upsert_cmd(name, schema, tuple(columns), conflict_key,
+                                 many=True),
+            params=values
+        )
+
+        return sequel
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _upsert_cmd(name: str, schema: str, columns: tuple,
+                    conflict_key: str, many: bool = False) -> sql.Composed:
+        """Returns the INSERT ... ON CONFLICT statement for a column set.
+
+        On conflict every inserted column is overwritten except the
+        conflict key itself and the id, which is kept from the existing row.
+        NOT NULL is checked before the conflict, so the columns must be
+        those of a full row.
+        """
+        if many:
+            values = sql.SQL("%s")
+        else:
+            values = sql.SQL("({})").format(
+                sql.SQL(', ').join(sql.Placeholder() * len(columns)))
+
+        assignments = [
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column))
+            for column in columns if column not in (conflict_key, 'id')]
+        if assignments:
+            action = sql.SQL("DO UPDATE SET {}").format(
+                sql.SQL(', ').join(assignments))
+        else:
+            action = sql.SQL("DO NOTHING")
+
+        return sql.SQL("INSERT into {}.{} ({}) values {} "
+                       "ON CONFLICT ({}) {};").format(
+            sql.Identifier(schema),
+            sql.Identifier(name),
+            sql.SQL(', ').join(map(sql.Identifier, columns)),
+            values,
+            sql.Identifier(conflict_key),
+            action
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def values_template(ncolumns: int) -> bytes:
+        """Returns the execute_values row template for a column count."""
+        return b'(' + b', '.join([b'%s'] * ncolumns) + b')'
+
+    def copy_from(self, name: str, schema: str, columns: list) -> Sequel:
 
         sequel = Sequel(
-            name="update",
-            description="Updated {}.{} setting {} = {} where {} = {}".format(
-                schema, name, column, value, filter_key, filter_value
+            name="copy_from",
+            description="Copied rows into {}.{} {}".format(
+                schema, name, columns
             ),
             query_context='access',
             object_type='table',
             object_name=name,
-            cmd=sql.SQL("UPDATE {}.{} SET {} = {} WHERE {} = {}").format(
+            cmd=sql.SQL("COPY {}.{} ({}) FROM STDIN WITH (FORMAT csv, "
+                        "NULL {})")
+            .format(
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.SQL(', ').join(map(sql.Identifier, tuple((*columns,)))),
+                sql.Literal(self.copy_null)
+            )
+        )
+
+        return sequel
+
+    def describe(self, name: str, schema: str) -> Sequel:
+
+        sequel = Sequel(
+            name="describe",
+            description="Selected no rows from {}.{} for its column types"
+            .format(schema, name),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("SELECT * FROM {}.{} LIMIT 0;").format(
+                sql.Identifier(schema),
+                sql.Identifier(name)
+            )
+        )
+
+        return sequel
+
+    def copy_to(self, name: str, schema: str, filter_key: str = None,
+                filter_value: Union[str, int, float] = None) -> Sequel:
+
+        if (filter_key is None) != (filter_value is None):
+            raise ValueError("where values not completely specified.")
+
+        if filter_key is None:
+            query = sql.SQL("{}.{}").format(
+                sql.Identifier(schema),
+                sql.Identifier(name)
+            )
+        else:
+            query = sql.SQL("(SELECT * FROM {}.{} WHERE {} = {})").format(
                 sql.Identifier(schema),
                 sql.Identifier(name),
-                sql.Identifier(column),
-                sql.Placeholder(),
                 sql.Identifier(filter_key),
-                sql.Placeholder()
+                sql.Literal(filter_value)
+            )
+
+        sequel = Sequel(
+            name="copy_to",
+            description="Copied * from {}.{} where {} = {}".format(
+                schema, name, filter_key, filter_value
             ),
-            params=(value, filter_value,)
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER, "
+                        "NULL {})").format(query, sql.Literal(self.copy_null))
         )
 
         return sequel
 
+    def update_batch(self, name: str, schema: str, columns: list,
+                     filter_key: str, values: list,
+                     now: tuple = ()) -> Sequel:
+
+        if any(len(columns) + 1 != len(row) for row in values):
+            raise ValueError(
+                "Number of columns doesn't match number of values")
+
+        sequel = Sequel(
+            name="update_batch",
+            description="Updated {} rows of {}.{} setting {} by {}".format(
+                len(values), schema, name, [*columns, *now], filter_key
+            ),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=self._update_columns_cmd(name=name, schema=schema,
+                                         columns=columns,
+                                         filter_key=filter_key, now=now),
+            params=values
+        )
+
+        return sequel
+
+    def _update_columns_cmd(self, name: str, schema: str, columns: list,
+                            filter_key: str, now: tuple = ()) -> sql.Composed:
+        assignments = [sql.SQL("{} = {}").format(sql.Identifier(column),
+                                                 sql.Placeholder())
+                       for column in columns]
+        assignments += [sql.SQL("{} = now()").format(sql.Identifier(column))
+                        for column in now]
+        return sql.SQL("UPDATE {}.{} SET {} WHERE {} = {}").format(
+            sql.Identifier(schema),
+            sql.Identifier(name),
+            sql.SQL(', ').join(assignments),
+            sql.Identifier(filter_key),
+            sql.Placeholder()
+        )
+
     def delete(self, name: str, schema: str, filter_key: str,
                filter_value: Union[str, float, int]) -> Sequel:
 
@@ -663,6 +1011,76 @@ class AccessSequel(AccessSequelBase):
 
         return sequel
 
+    def prepare_read(self, statement: str, name: str, schema: str,
+                     filter_key: str) -> Sequel:
+
+        sequel = Sequel(
+            name="prepare",
+            description="Prepared {} selecting * from {}.{} where {}".format(
+                statement, schema, name, filter_key
+            ),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("PREPARE {} AS SELECT * FROM {}.{} WHERE {} = $1;")
+            .format(
+                sql.Identifier(statement),
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.Identifier(filter_key)
+            )
+        )
+
+        return sequel
+
+    def prepare_update(self, statement: str, name: str, schema: str,
+                       columns: list, filter_key: str,
+                       now: tuple = ()) -> Sequel:
+
+        assignments = [sql.SQL("{} = ${}").format(sql.Identifier(column),
+                                                   sql.SQL(str(i + 1)))
+                       for i, column in enumerate(columns)]
+        assignments += [sql.SQL("{} = now()").format(sql.Identifier(column))
+                        for column in now]
+
+        sequel = Sequel(
+            name="prepare",
+            description="Prepared {} updating {}.{} setting {} where {}"
+            .format(statement, schema, name, [*columns, *now], filter_key),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("PREPARE {} AS UPDATE {}.{} SET {} WHERE {} = {};")
+            .format(
+                sql.Identifier(statement),
+                sql.Identifier(schema),
+                sql.Identifier(name),
+                sql.SQL(', ').join(assignments),
+                sql.Identifier(filter_key),
+                sql.SQL("${}".format(len(columns) + 1))
+            )
+        )
+
+        return sequel
+
+    def execute_prepared(self, statement: str, name: str,
+                         params: tuple) -> Sequel:
+
+        sequel = Sequel(
+            name="execute",
+            description="Executed {} with {}".format(statement, params),
+            query_context='access',
+            object_type='table',
+            object_name=name,
+            cmd=sql.SQL("EXECUTE {} ({});").format(
+                sql.Identifier(statement),
+                sql.SQL(', ').join(sql.Placeholder() * len(params))
+            ),
+            params=params
+        )
+
+        return sequel
+
     def begin(self) -> Sequel:
 
         sequel = Sequel(
@@ -18,18 +18,35 @@
 # License  : BSD 3-clause "New" or "Revised" License                          #
 # Copyright: (c) 2021 nov8.ai                                                 #
 # =========================================================================== #
+from datetime import datetime, timezone
 import logging
 
 import pytest
 import pandas as pd
-from src.infrastructure.data.connect import Connection
+from psycopg2 import extras
+from src.infrastructure.data.connect import Connection, PGConnectionPool
 from src.infrastructure.data.database import DatabaseConfiguration, Database
 from src.infrastructure.data.database import MetaDatabaseBuilder
+from src.infrastructure.data.config import DBCredentials
 from src.infrastructure.data.config import pg_pg_login, pg_rx2m_login
 from src.infrastructure.data.config import j2_rx2m_login
 # --------------------------------------------------------------------------- #
 logger = logging.getLogger(__name__)
 # --------------------------------------------------------------------------- #
+pg_test_login = DBCredentials().get('postgres', 'test')
+create_table_ddl_filepath = \
+    "src/infrastructure/data/ddl/metabase/metadata_table_create.sql"
+
+# Ten datasources, two of them metadata, loaded by access_database.
+datasources = [
+    (name, type_, 1, 'www.web.com', 'www.link.com', 'hcp', 7, 21, 'john',
+     False, datetime(2021, 8, 1, tzinfo=timezone.utc), 'john')
+    for name, type_ in [('studies', 'clinical'), ('drugs', 'clinical'),
+                        ('labels', 'product'), ('orange', 'product'),
+                        ('purple', 'product'), ('adverse', 'safety'),
+                        ('recalls', 'safety'), ('patents', 'ip'),
+                        ('aact', 'metadata'), ('openfda', 'metadata')]]
+# --------------------------------------------------------------------------- #
 
 
 # @pytest.fixture(scope="class")
@@ -57,3 +74,35 @@ def builder():
     )
 
     return MetaDatabaseBuilder(config)
+
+
+@pytest.fixture(scope="class")
+def access_database():
+    """Creates the test database with the metabase tables in the public
+    schema, seeds the datasources above, and yields a Connection to it."""
+    database = Database()
+    admin = Connection(pg_pg_login, autocommit=True)
+    database.terminate_database_processes(pg_test_login.dbname, admin)
+    database.delete(pg_test_login.dbname, admin)
+    database.create(pg_test_login.dbname, admin)
+
+    connection = Connection(pg_test_login, autocommit=True)
+    cursor = connection.cursor()
+    with open(create_table_ddl_filepath, "r") as ddl:
+        cursor.execute(ddl.read().replace('metabase.', 'public.'))
+    extras.execute_values(
+        cursor,
+        """INSERT INTO public.datasource (id, name, type, version, webpage,
+        link, link_type, frequency, lifecycle, creator, has_changed,
+        created, created_by) VALUES %s""",
+        [(str(i), *row) for i, row in enumerate(datasources)])
+    cursor.close()
+    connection.close()
+
+    yield connection
+
+    connection.close()
+    database.terminate_database_processes(pg_test_login.dbname, admin)
+    database.delete(pg_test_login.dbname, admin)
+    admin.close()
+    PGConnectionPool.close_all_connections()
@@ -19,11 +19,13 @@
 # Copyright: (c) 2021 nov8.ai                                                 #
 # =========================================================================== #
 import pytest
+import threading
 from datetime import datetime
 import pandas as pd
 import logging
 
 from src.infrastructure.data.access import PGDao
+from src.infrastructure.data.config import DBCredentials
 from src.infrastructure.data.database import Database
 from tests.test_utils.debugging import announce
 logger = logging.getLogger(__name__)
@@ -70,6 +72,23 @@ class AccessTests:
         assert df.shape[0] == 10, print("TestRead: Shape[0] incorrect.", df)
         assert df.shape[1] == 25, print("TestRead: Shape[1] incorrect.", df)
 
+    @announce
+    def test_read_copy(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        df = access.read_copy(name="datasource")
+        assert isinstance(
+            df, pd.DataFrame), print("TestReadCopy: TypeError.", df)
+        assert df.shape[0] == 10, print("TestRead: Shape[0] incorrect.", df)
+        assert df.shape[1] == 25, print("TestRead: Shape[1] incorrect.", df)
+        assert df['has_changed'].dtype == bool, \
+            print("TestReadCopy: Boolean dtype.", df.dtypes)
+        assert isinstance(df['created'].dtype, pd.DatetimeTZDtype), \
+            print("TestReadCopy: Timestamp dtype.", df.dtypes)
+        df = access.read_copy(name="datasource", filter_key="type",
+                              filter_value="metadata")
+        assert df.shape[0] == 2, print("TestRead: Shape[0] incorrect.", df)
+
     @announce
     def test_get_all_columns(self, access_database):
         connection = access_database
@@ -81,6 +100,42 @@ class AccessTests:
         assert df.shape[0] == 2, print("TestRead: Shape[0] incorrect.", df)
         assert df.shape[1] == 25, print("TestRead: Shape[1] incorrect.", df)
 
+    @announce
+    def test_read_prepared(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        for _ in range(2):
+            df = access.read_prepared(name="datasource", filter_key="type",
+                                      filter_value="metadata")
+            assert isinstance(
+                df, pd.DataFrame), print("TestReadPrepared: TypeError.", df)
+            assert df.shape[0] == 2, \
+                print("TestRead: Shape[0] incorrect.", df)
+            assert df.shape[1] == 25, \
+                print("TestRead: Shape[1] incorrect.", df)
+
+    @announce
+    def test_fetchone_dict(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        row = access.fetchone_dict(name="datasource", filter_key="name",
+                                   filter_value="studies")
+        assert isinstance(row, dict), print("TestFetchoneDict: TypeError.",
+                                            row)
+        assert row['name'] == 'studies', print("TestFetchoneDict: Value.",
+                                               row)
+        assert len(row) == 25, print("TestFetchoneDict: Length.", row)
+
+    @announce
+    def test_iter_read(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        rows = list(access.iter_read(name="datasource", chunksize=3))
+        assert len(rows) == 10, print("TestIterRead: Length.", rows)
+        assert all(isinstance(row, dict) for row in rows), \
+            print("TestIterRead: TypeError.", rows)
+        assert len(rows[0]) == 25, print("TestIterRead: Length.", rows)
+
     @announce
     def test_get_all_rows(self, access_database):
         connection = access_database
@@ -93,6 +148,66 @@ class AccessTests:
         assert df.shape[0] == 10, print("TestRead: Shape[0] incorrect.", df)
         assert df.shape[1] == 3, print("TestRead: Shape[1] incorrect.", df)
 
+    @announce
+    def test_from_pool(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        # More DAOs than the pool has connections; idle DAOs hold none.
+        daos = [PGDao.from_pool(credentials) for _ in range(25)]
+        for access in daos:
+            row = access.fetchone_dict(name="datasource", filter_key="name",
+                                       filter_value="studies")
+            assert row['name'] == 'studies', print("TestFromPool: Value.",
+                                                   row)
+
+    @announce
+    def test_threads(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        access = PGDao.from_pool(credentials)
+        errors = []
+
+        def read():
+            try:
+                for _ in range(50):
+                    row = access.fetchone_dict(
+                        name="datasource", filter_key="name",
+                        filter_value="studies")
+                    assert row['name'] == 'studies'
+            except Exception as e:
+                errors.append(e)
+
+        # One DAO shared by threads; each borrows its own connection.
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, print("TestThreads: Errors.", errors[:5])
+
+    @announce
+    def test_pool_waits(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        errors = []
+
+        def read():
+            try:
+                access = PGDao.from_pool(credentials)
+                for _ in range(20):
+                    with access.transaction() as tx:
+                        tx.fetchone_dict(name="datasource",
+                                         filter_key="name",
+                                         filter_value="studies")
+            except Exception as e:
+                errors.append(e)
+
+        # More threads than the pool has connections wait for one rather
+        # than fail with PoolError.
+        threads = [threading.Thread(target=read) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, print("TestPoolWaits: Errors.", errors[:5])
+
     @announce
     def test_create(self, access_database):
         columns = ['name', 'version', 'type', 'webpage', 'link',
@@ -133,6 +248,131 @@ class AccessTests:
         assert df[df.name == 'studies']['version'].values == 99, \
             print("TestUpdate: ValueError", df)
 
+    @announce
+    def test_update_many_columns(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        response = access.update_many_columns(
+            name="datasource", columns=['version', 'frequency'],
+            values=[98, 14], filter_key='name', filter_value='studies')
+        df = access.read(name="datasource",
+                         columns=["version", "frequency", "name"],
+                         filter_key="name", filter_value='studies')
+        assert response.rowcount == 1, \
+            print("TestUpdateManyColumns: ValueError", df)
+        assert df[df.name == 'studies']['version'].values == 98, \
+            print("TestUpdateManyColumns: ValueError", df)
+        assert df[df.name == 'studies']['frequency'].values == 14, \
+            print("TestUpdateManyColumns: ValueError", df)
+
+    @announce
+    def test_update_now(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        response = access.update_many_columns(
+            name="datasource", columns=['updated_by'], values=['john'],
+            filter_key='name', filter_value='studies', now=['updated'])
+        row = access.fetchone_dict(name="datasource", filter_key="name",
+                                   filter_value="studies")
+        assert response.rowcount == 1, print("TestUpdateNow: ValueError", row)
+        assert row['updated'] is not None, \
+            print("TestUpdateNow: ValueError", row)
+        assert row['updated_by'] == 'john', \
+            print("TestUpdateNow: ValueError", row)
+
+    @announce
+    def test_update_batch(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        response = access.update_batch(
+            name="datasource", columns=['version', 'frequency'],
+            values=[(97, 15, 'studies'), (2, 30, 'rhythm')],
+            filter_key='name')
+        df = access.read(name="datasource",
+                         columns=["version", "frequency", "name"])
+        assert response.rowcount == 2, \
+            print("TestUpdateBatch: ValueError", df)
+        assert df[df.name == 'studies']['version'].values == 97, \
+            print("TestUpdateBatch: ValueError", df)
+        assert df[df.name == 'rhythm']['frequency'].values == 30, \
+            print("TestUpdateBatch: ValueError", df)
+
+    @announce
+    def test_transaction(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        with pytest.raises(ValueError):
+            with access.transaction() as tx:
+                tx.update(name="datasource", column='version', value=1,
+                          filter_key='name', filter_value='studies')
+                raise ValueError("Rollback")
+        df = access.read(name="datasource", columns=["version", "name"],
+                         filter_key="name", filter_value='studies')
+        assert df[df.name == 'studies']['version'].values == 97, \
+            print("TestTransaction: ValueError", df)
+
+    @announce
+    def test_create_many(self, access_database):
+        columns = ['name', 'version', 'type', 'webpage', 'link',
+                   'lifecycle', 'frequency', 'creator', 'has_changed',
+                   'created', 'created_by', 'link_type']
+        values = [('beat', 1, 'sound', 'www.web.com', 'www.link.com',
+                   21, 7, "john", False, datetime.now(), 'john', 'hcp'),
+                  ('tempo', 1, 'sound', 'www.web.com', 'www.link.com',
+                   21, 7, "john", False, datetime.now(), 'john', 'hcp')]
+
+        connection = access_database
+        access = PGDao(connection)
+        response = access.create_many(
+            name="datasource", columns=columns, values=values)
+        df = access.read(name="datasource")
+        assert response.rowcount == 2, print("TestCreateMany: ValueError.", df)
+        assert df.shape[0] == 13, print("TestCreateMany: Shape[0].", df)
+        assert df[df.name == 'tempo']['lifecycle'].values == 21, \
+            print("TestCreateMany: ValueError.", df)
+        access.delete(name="datasource", filter_key="name",
+                      filter_value='beat')
+        access.delete(name="datasource", filter_key="name",
+                      filter_value='tempo')
+
+    @announce
+    def test_upsert(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        columns = ['name', 'version', 'type', 'webpage', 'link',
+                   'lifecycle', 'frequency', 'creator', 'has_changed',
+                   'created', 'created_by', 'link_type']
+        values = ['studies', 96, 'hcp', 'www.web.com', 'www.link.com',
+                  21, 16, "john", False, datetime.now(), 'john', 'hcp']
+        response = access.upsert(name="datasource", columns=columns,
+                                 values=values, conflict_key='name')
+        df = access.read(name="datasource")
+        assert response.rowcount == 1, print("TestUpsert: ValueError.", df)
+        assert df.shape[0] == 11, print("TestUpsert: Shape[0].", df)
+        assert df[df.name == 'studies']['version'].values == 96, \
+            print("TestUpsert: ValueError.", df)
+        assert df[df.name == 'studies']['frequency'].values == 16, \
+            print("TestUpsert: ValueError.", df)
+
+    @announce
+    def test_upsert_many(self, access_database):
+        connection = access_database
+        access = PGDao(connection)
+        columns = ['name', 'version', 'type', 'webpage', 'link',
+                   'lifecycle', 'frequency', 'creator', 'has_changed',
+                   'created', 'created_by', 'link_type']
+        values = [(name, 95, 'hcp', 'www.web.com', 'www.link.com', 21, 7,
+                   "john", False, datetime.now(), 'john', 'hcp')
+                  for name in ('studies', 'drugs')]
+        response = access.upsert_many(name="datasource", columns=columns,
+                                      values=values, conflict_key='name')
+        df = access.read(name="datasource")
+        assert response.rowcount == 2, print("TestUpsertMany: ValueError.", df)
+        assert df.shape[0] == 11, print("TestUpsertMany: Shape[0].", df)
+        versions = df[df.name.isin(['studies', 'drugs'])]['version']
+        assert (versions == 95).all(), \
+            print("TestUpsertMany: ValueError.", df)
+
     @announce
     def test_delete(self, access_database):
         connection = access_database
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# =========================================================================== #
+# Project  : Drug Approval Analytics                                          #
+# Version  : 0.1.0                                                            #
+# File     : \tests\test_infrastructure_layer\test_batch.py                   #
+# Language : Python 3.9.5                                                     #
+# --------------------------------------------------------------------------  #
+# Author   : John James                                                       #
+# Company  : nov8.ai                                                          #
+# Email    : john.james@nov8.ai                                               #
+# URL      : https://github.com/john-james-sf/drug-approval-analytics         #
+# --------------------------------------------------------------------------  #
+# Created  : Friday, August 20th 2021, 10:14:08 am                            #
+# Modified : Friday, August 20th 2021, 10:14:08 am                            #
+# Modifier : John James (john.james@nov8.ai)                                  #
+# --------------------------------------------------------------------------- #
+# License  : BSD 3-clause "New" or "Revised" License                          #
+# Copyright: (c) 2021 nov8.ai                                                 #
+# =========================================================================== #
+from contextlib import contextmanager
+import logging
+import threading
+
+import pytest
+
+from src.infrastructure.data import batch
+from src.infrastructure.data.batch import WriteBatcher
+from tests.test_utils.debugging import announce
+logger = logging.getLogger(__name__)
+# -----------------------------------------------------------------------------#
+
+
+class FakeDao:
+    """Records the writes committed by each transaction."""
+
+    def __init__(self) -> None:
+        self.committed = []
+        self.rolled_back = 0
+        self._writes = None
+
+    @contextmanager
+    def transaction(self):
+        self._writes = []
+        try:
+            yield self
+        except Exception:
+            self.rolled_back += 1
+            raise
+        self.committed.append(self._writes)
+
+    def write(self, value):
+        self._writes.append(value)
+        return value
+
+
+def fail(dao):
+    raise ValueError("Bad write")
+
+
+@pytest.fixture
+def dao(monkeypatch):
+    dao = FakeDao()
+    monkeypatch.setattr(batch.PGDao, "from_pool",
+                        lambda credentials, autocommit: dao)
+    return dao
+
+
+@pytest.mark.batch
+class WriteBatcherTests:
+
+    @announce
+    def test_execute_solo(self, dao):
+        batcher = WriteBatcher(credentials=None)
+        assert batcher.execute(lambda dao: dao.write(1)) == 1, \
+            print("TestExecuteSolo: ValueError", dao.committed)
+        assert dao.committed == [[1]], \
+            print("TestExecuteSolo: ValueError", dao.committed)
+        assert batcher._writer is None, \
+            print("TestExecuteSolo: Writer started without contention.")
+
+    @announce
+    def test_execute_contended(self, dao):
+        batcher = WriteBatcher(credentials=None, max_batch=5, max_wait=5)
+        queued = threading.Semaphore(0)
+        submit = batcher.submit
+
+        def counted(operation):
+            future = submit(operation)
+            queued.release()
+            return future
+
+        batcher.submit = counted
+        results = {}
+
+        def writer(i):
+            results[i] = batcher.execute(lambda dao: dao.write(i))
+
+        # Holding the lock stands in for a writer already committing, so
+        # every caller has to queue for the background writer.
+        with batcher._lock:
+            threads = [threading.Thread(target=writer, args=(i,))
+                       for i in range(5)]
+            for thread in threads:
+                thread.start()
+            for _ in threads:
+                queued.acquire()
+        for thread in threads:
+            thread.join()
+
+        assert results == {i: i for i in range(5)}, \
+            print("TestExecuteContended: ValueError", results)
+        assert len(dao.committed) == 1, \
+            print("TestExecuteContended: Not one transaction", dao.committed)
+        assert sorted(dao.committed[0]) == list(range(5)), \
+            print("TestExecuteContended: ValueError", dao.committed)
+
+    @announce
+    def test_retry_after_failed_batch(self, dao):
+        batcher = WriteBatcher(credentials=None, max_batch=3, max_wait=5)
+        futures = [batcher.submit(lambda dao: dao.write('a')),
+                   batcher.submit(fail),
+                   batcher.submit(lambda dao: dao.write('b'))]
+
+        assert futures[0].result(timeout=10) == 'a', \
+            print("TestRetry: ValueError", dao.committed)
+        assert futures[2].result(timeout=10) == 'b', \
+            print("TestRetry: ValueError", dao.committed)
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=10)
+        # The batch and then the bad operation on its own are rolled back;
+        # the good operations commit individually.
+        assert dao.rolled_back == 2, \
+            print("TestRetry: Rollbacks", dao.rolled_back)
+        assert dao.committed == [['a'], ['b']], \
+            print("TestRetry: ValueError", dao.committed)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# =========================================================================== #
+# Project  : Drug Approval Analytics                                          #
+# Version  : 0.1.0                                                            #
+# File     : \tests\test_infrastructure_layer\test_repository.py              #
+# Language : Python 3.9.5                                                     #
+# --------------------------------------------------------------------------  #
+# Author   : John James                                                       #
+# Company  : nov8.ai                                                          #
+# Email    : john.james@nov8.ai                                               #
+# URL      : https://github.com/john-james-sf/drug-approval-analytics         #
+# --------------------------------------------------------------------------  #
+# Created  : Friday, August 20th 2021, 9:02:41 am                             #
+# Modified : Friday, August 20th 2021, 9:02:41 am                             #
+# Modifier : John James (john.james@nov8.ai)                                  #
+# --------------------------------------------------------------------------- #
+# License  : BSD 3-clause "New" or "Revised" License                          #
+# Copyright: (c) 2021 nov8.ai                                                 #
+# =========================================================================== #
+import asyncio
+import pandas as pd
+import pytest
+from datetime import date, datetime, timedelta, timezone
+import logging
+import threading
+
+from src.infrastructure.data.access import PGDao
+from src.infrastructure.data.aio import AsyncPGDao
+from src.infrastructure.data.config import DBCredentials
+from src.infrastructure.data.sequel import TableSequel
+from src.infrastructure.data.repository import DataSource, DataSourceEvent
+from tests.test_utils.debugging import announce
+logger = logging.getLogger(__name__)
+# -----------------------------------------------------------------------------#
+dbname = "test"
+
+
+def datasource(name: str, **kwargs) -> dict:
+    row = {'name': name, 'type': 'sound', 'version': 1,
+           'webpage': 'www.web.com', 'link': 'www.link.com',
+           'link_type': 'hcp', 'frequency': 7, 'lifecycle': 21,
+           'creator': 'john', 'has_changed': False,
+           'created': datetime.now(timezone.utc), 'created_by': 'john'}
+    row.update(kwargs)
+    return row
+
+
+def event(**kwargs) -> dict:
+    now = datetime.now(timezone.utc)
+    row = {'name': 'extract', 'datasource_id': '1',
+           'started': now, 'ended': now, 'return_code': 0,
+           'return_value': 'ok', 'created_by': 'john'}
+    row.update(kwargs)
+    return row
+
+
+@pytest.mark.repository
+class DataSourceTests:
+
+    @announce
+    def test_create(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        row = datasource('rhythm', created=None)
+        row['source_type'] = row.pop('type')
+        row['source_updated'] = None
+        id = repository.create(**row)
+        access = PGDao.from_pool(credentials)
+        result = access.fetchone_dict(name="datasource", filter_key='id',
+                                      filter_value=id)
+        assert result['type'] == 'sound', print("TestCreate: Type.", result)
+        assert result['created'] is not None, \
+            print("TestCreate: Created.", result)
+
+    @announce
+    def test_acreate(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        row = datasource('groove', created=None)
+        row['source_type'] = row.pop('type')
+        row['source_updated'] = None
+
+        async def create():
+            id = await repository.acreate(**row)
+            await AsyncPGDao.close_all()
+            return id
+
+        id = asyncio.run(create())
+        access = PGDao.from_pool(credentials)
+        result = access.fetchone_dict(name="datasource", filter_key='id',
+                                      filter_value=id)
+        assert result['name'] == 'groove', print("TestACreate: Name.", result)
+        assert result['created'] is not None, \
+            print("TestACreate: Created.", result)
+        access.delete(name="datasource", filter_key='id', filter_value=id)
+
+    @announce
+    def test_create_many(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        beat = datasource('beat')
+        # Rows without created are stamped by the column default.
+        del beat['created']
+        repository.create_many([beat, datasource('tempo')])
+        # Read through a separate DAO, so only committed rows are seen.
+        access = PGDao.from_pool(credentials)
+        df = access.read(name="datasource")
+        assert df.shape[0] == 13, print("TestCreateMany: Shape[0].", df)
+        assert df[df.name == 'beat']['created'].notnull().all(), \
+            print("TestCreateMany: Created.", df)
+
+    @announce
+    def test_create_copy(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        # '' and None have to reach the table as '' and NULL.
+        repository.create_copy([datasource('pulse', description='',
+                                           title=None,
+                                           uris=['www.uri.com', None])])
+        access = PGDao.from_pool(credentials)
+        df = access.read(name="datasource")
+        assert df.shape[0] == 14, print("TestCreateCopy: Shape[0].", df)
+        result = access.fetchone_dict(name="datasource", filter_key='name',
+                                      filter_value='pulse')
+        assert result['description'] == '', \
+            print("TestCreateCopy: Description.", result)
+        assert result['title'] is None, print("TestCreateCopy: Title.", result)
+        assert result['uris'] == ['www.uri.com', None], \
+            print("TestCreateCopy: Uris.", result)
+
+    @announce
+    def test_read_copy(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        repository.create_copy([datasource('NA', title='007',
+                                           coverage='None', description='',
+                                           maintainer=None)])
+        access = PGDao.from_pool(credentials)
+        df = access.read_copy(name="datasource", filter_key='name',
+                              filter_value='NA')
+        row = df.iloc[0]
+        assert row['name'] == 'NA', print("TestReadCopy: Name.", row)
+        assert row['title'] == '007', print("TestReadCopy: Title.", row)
+        assert row['coverage'] == 'None', print("TestReadCopy: Coverage.", row)
+        assert row['description'] == '', \
+            print("TestReadCopy: Description.", row)
+        assert pd.isna(row['maintainer']), \
+            print("TestReadCopy: Maintainer.", row)
+
+    @announce
+    def test_update_by_id(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        row = datasource('cadence')
+        row['source_type'] = row.pop('type')
+        row['source_updated'] = None
+        # The id handed back is used straight away, so the row it names
+        # must already be committed.
+        id = repository.create(**row)
+        repository.update(name=None, version=2, uris=['www.uri.com'],
+                          has_changed=True, source_updated=None,
+                          updated=None, updated_by='jane', id=id)
+        access = PGDao.from_pool(credentials)
+        result = access.fetchone_dict(name="datasource", filter_key='id',
+                                      filter_value=id)
+        assert result['updated_by'] == 'jane', \
+            print("TestUpdateById: Updated_by.", result)
+        assert result['uris'] == ['www.uri.com'], \
+            print("TestUpdateById: Uris.", result)
+        assert result['updated'] is not None, \
+            print("TestUpdateById: Updated.", result)
+
+    @announce
+    def test_upsert(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        repository.upsert(**datasource('cadence', version=5))
+        access = PGDao.from_pool(credentials)
+        result = access.fetchone_dict(name="datasource", filter_key='name',
+                                      filter_value='cadence')
+        assert result['version'] == 5, print("TestUpsert: Version.", result)
+        assert result['type'] == 'sound', print("TestUpsert: Type.", result)
+
+    @announce
+    def test_upsert_concurrent(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials, autocommit=True)
+        errors = []
+
+        def upsert(version):
+            try:
+                repository.upsert(**datasource('meter', version=version))
+            except Exception as e:
+                errors.append(e)
+
+        # Upserts of a new name racing each other: one inserts, the rest
+        # update the row it inserted.
+        threads = [threading.Thread(target=upsert, args=(version,))
+                   for version in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, print("TestUpsertConcurrent: Errors.", errors)
+        access = PGDao.from_pool(credentials)
+        df = access.read(name="datasource", filter_key='name',
+                         filter_value='meter')
+        assert df.shape[0] == 1, print("TestUpsertConcurrent: Rows.", df)
+
+    @announce
+    def test_update_many(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        id = repository.read_one('cadence')['id']
+        updated = datetime(2021, 8, 20, tzinfo=timezone.utc)
+        repository.update_many([
+            {'name': 'rhythm', 'version': 2, 'uris': ['www.uri.com'],
+             'has_changed': True, 'source_updated': None,
+             'updated_by': 'jane'},
+            {'id': id, 'version': 6, 'uris': None, 'has_changed': False,
+             'source_updated': None, 'updated': updated,
+             'updated_by': 'jim'}])
+        access = PGDao.from_pool(credentials)
+        rhythm = access.fetchone_dict(name="datasource", filter_key='name',
+                                      filter_value='rhythm')
+        cadence = access.fetchone_dict(name="datasource", filter_key='id',
+                                       filter_value=id)
+        assert rhythm['updated_by'] == 'jane', \
+            print("TestUpdateMany: Updated_by.", rhythm)
+        assert rhythm['updated'] is not None, \
+            print("TestUpdateMany: Updated.", rhythm)
+        assert cadence['updated_by'] == 'jim', \
+            print("TestUpdateMany: Updated_by.", cadence)
+        assert cadence['updated'] == updated, \
+            print("TestUpdateMany: Updated.", cadence)
+
+    @announce
+    def test_aupdate(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+
+        async def update():
+            # Concurrent first uses share one pool rather than racing.
+            pools = await asyncio.gather(
+                *(AsyncPGDao(credentials)._pool() for _ in range(5)))
+            assert len(set(map(id, pools))) == 1, \
+                print("TestAUpdate: Pools.", pools)
+            await repository.aupdate(name='tempo', version=2, uris=None,
+                                     has_changed=True, source_updated=None,
+                                     updated=None, updated_by='joan')
+            await AsyncPGDao.close_all()
+            return pools[0]
+
+        pool = asyncio.run(update())
+        assert pool.is_closing(), print("TestAUpdate: Pool not closed.")
+        access = PGDao.from_pool(credentials)
+        result = access.fetchone_dict(name="datasource", filter_key='name',
+                                      filter_value='tempo')
+        assert result['updated_by'] == 'joan', \
+            print("TestAUpdate: Updated_by.", result)
+        assert result['updated'] is not None, \
+            print("TestAUpdate: Updated.", result)
+
+    @announce
+    def test_read_iter(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials, autocommit=True)
+        access = PGDao.from_pool(credentials)
+        rows = repository.read_iter(chunksize=2)
+        next(rows)
+        # Neither a write nor a nested iteration joins the open read.
+        repository.update(name='tempo', version=3, uris=None,
+                          has_changed=False, source_updated=None,
+                          updated=None, updated_by='jack')
+        result = access.fetchone_dict(name="datasource", filter_key='name',
+                                      filter_value='tempo')
+        assert result['updated_by'] == 'jack', \
+            print("TestReadIter: Write not committed.", result)
+        inner = list(repository.read_iter(chunksize=2))
+        outer = 1 + len(list(rows))
+        assert outer == len(inner) == 17, \
+            print("TestReadIter: Rows.", outer, len(inner))
+
+    @announce
+    def test_delete(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSource(credentials)
+        for name in ('rhythm', 'beat', 'tempo', 'pulse', 'NA', 'cadence',
+                     'meter'):
+            repository.delete(name)
+        access = PGDao.from_pool(credentials)
+        df = access.read(name="datasource")
+        assert df.shape[0] == 10, print("TestDelete: Shape[0].", df)
+
+
+@pytest.mark.repository
+class DataSourceEventTests:
+
+    @announce
+    def test_rotate(self, access_database):
+        credentials = DBCredentials().get('postgres', dbname)
+        repository = DataSourceEvent(credentials)
+        access = PGDao.from_pool(credentials)
+        # Today's partition is created with the table; an event from a day
+        # without one falls into the default partition.
+        repository.create(**event())
+        repository.create(**event(
+            created=datetime(2021, 8, 1, 12, tzinfo=timezone.utc)))
+        df = access.read(name="datasourceevent_default")
+        assert df.shape[0] == 1, print("TestRotate: Default.", df)
+
+        repository.rotate()
+        df = access.read(name="datasourceevent_default")
+        assert df.shape[0] == 0, print("TestRotate: Default.", df)
+        df = access.read(name="datasourceevent_20210801")
+        assert df.shape[0] == 1, print("TestRotate: Moved.", df)
+        df = access.read(name="datasourceevent")
+        assert df.shape[0] == 2, print("TestRotate: Shape[0].", df)
+
+        # A rotation after missed days still runs on days with events.
+        repository.rotate(date.today() + timedelta(days=10))
+        partition = "datasourceevent_{}".format(
+            (date.today() + timedelta(days=17)).strftime("%Y%m%d"))
+        df = access.read(name=partition)
+        assert df.shape[0] == 0, print("TestRotate: Ahead.", df)
+        unlogged = access.execute(TableSequel().unlogged_partitions(
+            name="datasourceevent", schema="public")).fetchall
+        assert min(name for name, in unlogged) == "datasourceevent_{}".format(
+            (date.today() + timedelta(days=10)).strftime("%Y%m%d")), \
+            print("TestRotate: Logged.", unlogged)
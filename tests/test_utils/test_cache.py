@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# =========================================================================== #
+# Project  : Drug Approval Analytics                                          #
+# Version  : 0.1.0                                                            #
+# File     : \tests\test_utils\test_cache.py                                  #
+# Language : Python 3.9.5                                                     #
+# --------------------------------------------------------------------------  #
+# Author   : John James                                                       #
+# Company  : nov8.ai                                                          #
+# Email    : john.james@nov8.ai                                               #
+# URL      : https://github.com/john-james-sf/drug-approval-analytics         #
+# --------------------------------------------------------------------------  #
+# Created  : Friday, August 20th 2021, 11:32:16 am                            #
+# Modified : Friday, August 20th 2021, 11:32:16 am                            #
+# Modifier : John James (john.james@nov8.ai)                                  #
+# --------------------------------------------------------------------------- #
+# License  : BSD 3-clause "New" or "Revised" License                          #
+# Copyright: (c) 2021 nov8.ai                                                 #
+# =========================================================================== #
+import logging
+
+import pytest
+
+from src.utils import cache
+from src.utils.cache import TTLCache
+from tests.test_utils.debugging import announce
+logger = logging.getLogger(__name__)
+# -----------------------------------------------------------------------------#
+
+
+class Clock:
+    """Stands in for time.monotonic, advanced by hand."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.cache
+class TTLCacheTests:
+
+    @announce
+    def test_expiry(self, clock):
+        ttl = TTLCache(maxsize=4, ttl=30)
+        ttl.set('studies', 1)
+        clock.now += 30
+        assert ttl.get('studies') == 1, print("TestExpiry: Expired early.")
+        clock.now += 1
+        assert ttl.get('studies') is None, print("TestExpiry: Not expired.")
+        assert ttl.get('studies', 'missing') == 'missing', \
+            print("TestExpiry: Default not returned.")
+
+    @announce
+    def test_lru_eviction(self, clock):
+        ttl = TTLCache(maxsize=2, ttl=30)
+        ttl.set('studies', 1)
+        ttl.set('drugs', 2)
+        # Reading studies makes drugs the least recently used.
+        ttl.get('studies')
+        ttl.set('labels', 3)
+        assert ttl.get('drugs') is None, print("TestLRU: LRU not evicted.")
+        assert ttl.get('studies') == 1, print("TestLRU: MRU evicted.")
+        assert ttl.get('labels') == 3, print("TestLRU: New entry evicted.")
+
+    @announce
+    def test_invalidate(self, clock):
+        ttl = TTLCache(maxsize=4, ttl=30)
+        ttl.set('studies', 1)
+        ttl.set('drugs', 2)
+        ttl.invalidate('studies')
+        ttl.invalidate('orange')
+        assert ttl.get('studies') is None, print("TestInvalidate: Kept.")
+        assert ttl.get('drugs') == 2, print("TestInvalidate: Dropped other.")
+
+    @announce
+    def test_clear(self, clock):
+        ttl = TTLCache(maxsize=4, ttl=30)
+        ttl.set('studies', 1)
+        ttl.set('drugs', 2)
+        ttl.clear()
+        assert ttl.get('studies') is None, print("TestClear: Kept studies.")
+        assert ttl.get('drugs') is None, print("TestClear: Kept drugs.")